@@ -7,5 +7,18 @@ class Settings(BaseSettings):
     AWS_REGION: str
     DATABASE_URL: str
 
+    MODEL_MAX_CONCURRENCY: int = 2
+    MODEL_MAX_QUEUE_SIZE: int = 32
+    MODEL_QUEUE_TIMEOUT: float = 10.0
+    MODEL_RETRY_AFTER: int = 1
+
+    MODEL_CACHE_SIZE: int = 10
+    MODEL_REFRESH_INTERVAL: float = 300.0
+
+    PRELOAD_MODELS: list[str] = []
+    SERVE_HOST: str = "0.0.0.0"
+    SERVE_PORT: int = 8000
+    SERVE_WORKERS: int = 0
+
 
 settings = Settings()
@@ -1,18 +1,59 @@
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
+from pydantic import BaseModel
 
+from backend.config import settings
+from backend.db import dispose_engine
 from backend.routes.forward_routes import router as forward_router
 from backend.routes.history_routes import router as history_router
 from backend.routes.models_routes import router as models_router
+from backend.utils.model_manager import refresh_models
 from core.schemas.api.forward import ForwardResponse
 
-app = FastAPI(title="Backend API")
+
+async def _refresh_models_periodically() -> None:
+    while True:
+        await asyncio.sleep(settings.MODEL_REFRESH_INTERVAL)
+        await run_in_threadpool(refresh_models)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    refresh_task = None
+    if settings.MODEL_REFRESH_INTERVAL > 0:
+        refresh_task = asyncio.create_task(_refresh_models_periodically())
+    yield
+    if refresh_task is not None:
+        refresh_task.cancel()
+    await dispose_engine()
+
+
+app = FastAPI(title="Backend API", lifespan=lifespan)
 app.include_router(forward_router)
 app.include_router(models_router)
 app.include_router(history_router)
 
 
+def _error_model(request: Request) -> type[BaseModel]:
+    # Errors follow the response model of the route when it has an error field
+    response_model = getattr(request.scope.get("route"), "response_model", None)
+    if (
+        isinstance(response_model, type)
+        and issubclass(response_model, BaseModel)
+        and "error" in response_model.model_fields
+    ):
+        return response_model
+    return ForwardResponse
+
+
 @app.exception_handler(HTTPException)
-async def http_exception_handler(_: Request, exc: HTTPException) -> JSONResponse:
-    payload = ForwardResponse(result=None, error=str(exc.detail)).model_dump()
-    return JSONResponse(status_code=exc.status_code, content=payload)
+async def http_exception_handler(request: Request, exc: HTTPException) -> JSONResponse:
+    payload = _error_model(request)(error=str(exc.detail)).model_dump()
+    return JSONResponse(
+        status_code=exc.status_code, content=payload, headers=exc.headers
+    )
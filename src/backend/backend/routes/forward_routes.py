@@ -1,14 +1,25 @@
+import asyncio
+from collections import defaultdict
 from uuid import uuid4
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from backend.config import settings
 from backend.db import get_db
 from backend.models.history import History
-from backend.utils.model_manager import get_model_runner
+from backend.utils.admission import ModelOverloadedError
+from backend.utils.model_manager import get_admission_gate, use_model_runner
 from backend.utils.s3_loader import list_models
-from core.schemas.api.forward import ForwardRequest, ForwardResponse, HubScore
+from core.schemas.api.forward import (
+    CompareRequest,
+    CompareResponse,
+    ForwardRequest,
+    ForwardResponse,
+    HubScore,
+    ModelScores,
+)
 
 router = APIRouter(prefix="/forward", tags=["forward"])
 
@@ -26,6 +37,40 @@ DEFAULT_HUBS = [
     "business-laws",
 ]
 
+RANK_FUSION_K = 60
+
+
+def _score_hubs(model_key: str, text: str, hubs: list[str]) -> list[HubScore]:
+    with use_model_runner(model_key) as runner:
+        scores = runner.predict_proba_hubs(text, hubs)
+    return [HubScore(hub=hub, score=score) for hub, score in zip(hubs, scores)]
+
+
+async def _score_hubs_admitted(
+    model_key: str, text: str, hubs: list[str]
+) -> list[HubScore]:
+    async with get_admission_gate(model_key).admit():
+        scores = await run_in_threadpool(_score_hubs, model_key, text, hubs)
+
+    scores.sort(key=lambda x: x.score, reverse=True)
+    return scores
+
+
+def _fuse_scores(results: list[list[HubScore]], method: str) -> list[HubScore]:
+    fused: dict[str, float] = defaultdict(float)
+    for scores in results:
+        for rank, item in enumerate(scores):
+            if method == "mean":
+                fused[item.hub] += item.score / len(results)
+            else:
+                fused[item.hub] += 1.0 / (RANK_FUSION_K + rank + 1)
+
+    return sorted(
+        (HubScore(hub=hub, score=score) for hub, score in fused.items()),
+        key=lambda x: x.score,
+        reverse=True,
+    )
+
 
 @router.post("", response_model=ForwardResponse)
 async def forward(
@@ -48,19 +93,21 @@ async def forward(
 
         hubs_to_score = request.hubs or DEFAULT_HUBS
 
-        runner = get_model_runner(model_key)
-        scores = []
-        for hub in hubs_to_score:
-            score = runner.predict_proba(request.text, hub)
-            scores.append(HubScore(hub=hub, score=score))
-
-        scores.sort(key=lambda x: x.score, reverse=True)
+        scores = await _score_hubs_admitted(model_key, request.text, hubs_to_score)
 
         return ForwardResponse(result=scores)
 
     except HTTPException:
         raise
 
+    except ModelOverloadedError as exception:
+        http_status = status.HTTP_429_TOO_MANY_REQUESTS
+        raise HTTPException(
+            status_code=http_status,
+            detail=str(exception),
+            headers={"Retry-After": str(exception.retry_after)},
+        )
+
     except Exception as exception:
         http_status = status.HTTP_500_INTERNAL_SERVER_ERROR
         raise HTTPException(
@@ -77,3 +124,71 @@ async def forward(
             )
         )
         await db.commit()
+
+
+@router.post("/compare", response_model=CompareResponse)
+async def forward_compare(
+    request: CompareRequest,
+    db: AsyncSession = Depends(get_db),
+) -> CompareResponse:
+    query_id = uuid4()
+    http_status = status.HTTP_200_OK
+
+    model_keys = [
+        f"{model_name}.{settings.MODEL_EXTENSION}" for model_name in request.model_names
+    ]
+
+    try:
+        available_models = list_models()
+        missing_models = [key for key in model_keys if key not in available_models]
+        if missing_models:
+            http_status = status.HTTP_400_BAD_REQUEST
+            raise HTTPException(
+                status_code=http_status,
+                detail=f"Models {missing_models} are not found",
+            )
+
+        hubs_to_score = request.hubs or DEFAULT_HUBS
+
+        results = await asyncio.gather(
+            *(
+                _score_hubs_admitted(model_key, request.text, hubs_to_score)
+                for model_key in model_keys
+            )
+        )
+
+        return CompareResponse(
+            results=[
+                ModelScores(model_name=model_name, result=scores)
+                for model_name, scores in zip(request.model_names, results)
+            ],
+            fused=_fuse_scores(results, request.fusion) if request.fusion else None,
+        )
+
+    except HTTPException:
+        raise
+
+    except ModelOverloadedError as exception:
+        http_status = status.HTTP_429_TOO_MANY_REQUESTS
+        raise HTTPException(
+            status_code=http_status,
+            detail=str(exception),
+            headers={"Retry-After": str(exception.retry_after)},
+        )
+
+    except Exception as exception:
+        http_status = status.HTTP_500_INTERNAL_SERVER_ERROR
+        raise HTTPException(
+            status_code=http_status,
+            detail=f"Error during model inference: {str(exception)}",
+        )
+
+    finally:
+        db.add(
+            History(
+                query_id=query_id,
+                endpoint="/forward/compare",
+                code_status=http_status,
+            )
+        )
+        await db.commit()
@@ -6,8 +6,14 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from backend.config import settings
 from backend.db import get_db
 from backend.models.history import History
+from backend.utils.model_manager import get_admission_gates
 from backend.utils.s3_loader import list_models
-from core.schemas.api.models import ModelItem, ModelListResponse
+from core.schemas.api.models import (
+    ModelItem,
+    ModelListResponse,
+    ModelLoadItem,
+    ModelLoadResponse,
+)
 
 router = APIRouter(prefix="/models", tags=["models"])
 
@@ -36,3 +42,20 @@ async def get_models(
             )
         )
         await db.commit()
+
+
+@router.get("/load", response_model=ModelLoadResponse)
+async def get_models_load() -> ModelLoadResponse:
+    return ModelLoadResponse(
+        models=[
+            ModelLoadItem(
+                name=gate.model_key.replace(f".{settings.MODEL_EXTENSION}", ""),
+                in_flight=gate.in_flight,
+                queued=gate.queued,
+                rejected=gate.rejected,
+                max_concurrency=gate.max_concurrency,
+                max_queue_size=gate.max_queue_size,
+            )
+            for gate in get_admission_gates()
+        ]
+    )
@@ -0,0 +1,85 @@
+"""
+Preload-then-fork serving mode.
+
+The master process downloads and prepares every model from PRELOAD_MODELS,
+binds the listening socket and forks SERVE_WORKERS uvicorn workers. Hub matrices
+are memory-mapped read-only, so all workers share the same physical pages.
+ONNX sessions are created after the fork, inside each worker.
+
+Usage:
+    python -m backend.serve
+"""
+
+import logging
+import os
+import signal
+import sys
+
+import uvicorn
+
+from backend.config import settings
+from backend.utils.model_manager import preload_model
+from backend.utils.onnx_runner import prepare_model
+from backend.utils.s3_loader import get_s3_client
+
+logger = logging.getLogger("backend.serve")
+
+
+def _model_key(model_name: str) -> str:
+    return f"{model_name}.{settings.MODEL_EXTENSION}"
+
+
+def _run_worker(config: uvicorn.Config, sockets: list) -> None:
+    # The master's S3 connection pool must not be shared with the workers
+    get_s3_client.cache_clear()
+    for model_name in settings.PRELOAD_MODELS:
+        preload_model(_model_key(model_name))
+    uvicorn.Server(config).run(sockets=sockets)
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+
+    for model_name in settings.PRELOAD_MODELS:
+        logger.info("Preloading model %s", model_name)
+        prepare_model(_model_key(model_name))
+
+    config = uvicorn.Config(
+        "backend.main:app", host=settings.SERVE_HOST, port=settings.SERVE_PORT
+    )
+    sock = config.bind_socket()
+    workers = settings.SERVE_WORKERS or os.cpu_count() or 1
+
+    children: list[int] = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            try:
+                _run_worker(config, [sock])
+            finally:
+                os._exit(0)
+        children.append(pid)
+    logger.info("Started %d workers on %s:%d", workers, config.host, config.port)
+
+    def _shutdown(signum: int, _: object) -> None:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, _shutdown)
+    signal.signal(signal.SIGINT, _shutdown)
+
+    exit_code = 0
+    for pid in children:
+        _, status = os.waitpid(pid, 0)
+        exit_code = exit_code or os.waitstatus_to_exitcode(status)
+    sock.close()
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+
+class ModelOverloadedError(Exception):
+    """Raised when a model cannot admit a request within its queue limits."""
+
+    def __init__(self, model_key: str, retry_after: int):
+        super().__init__(f"Model '{model_key}' is overloaded, retry later")
+        self.model_key = model_key
+        self.retry_after = retry_after
+
+
+class AdmissionGate:
+    """
+    Per-model admission control: at most `max_concurrency` requests run at once,
+    at most `max_queue_size` wait for a slot, the rest are rejected immediately.
+    """
+
+    def __init__(
+        self,
+        model_key: str,
+        max_concurrency: int,
+        max_queue_size: int,
+        queue_timeout: float,
+        retry_after: int,
+    ):
+        self.model_key = model_key
+        self.max_concurrency = max_concurrency
+        self.max_queue_size = max_queue_size
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.queued = 0
+        self.rejected = 0
+
+    def _reject(self) -> ModelOverloadedError:
+        self.rejected += 1
+        return ModelOverloadedError(self.model_key, self.retry_after)
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+        elif self.queued >= self.max_queue_size:
+            raise self._reject()
+        else:
+            self.queued += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                raise self._reject() from None
+            finally:
+                self.queued -= 1
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
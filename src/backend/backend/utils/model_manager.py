@@ -1,8 +1,194 @@
-from functools import lru_cache
+import logging
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Iterator
+from contextlib import contextmanager
 
-from backend.utils.onnx_runner import ONNXInference
+from backend.config import settings
+from backend.utils.admission import AdmissionGate
+from backend.utils.onnx_runner import ONNXInference, lock_model, remove_model
+from backend.utils.s3_loader import ModelVersion, get_model_version
 
+logger = logging.getLogger(__name__)
 
-@lru_cache(maxsize=10)
-def get_model_runner(model_key: str) -> ONNXInference:
-    return ONNXInference(model_key)
+
+class ModelHandle:
+    """
+    A loaded model version together with the number of requests using it and
+    the shared lock that keeps its cached files from being pruned.
+    """
+
+    def __init__(
+        self,
+        model_key: str,
+        runner: ONNXInference,
+        version: ModelVersion,
+        lock_fd: int,
+    ):
+        self.model_key = model_key
+        self.runner: ONNXInference | None = runner
+        self.version = version
+        self.lock_fd: int | None = lock_fd
+        self.in_flight = 0
+        self.retired = False
+
+
+_admission_gates: dict[str, AdmissionGate] = {}
+_handles: OrderedDict[str, ModelHandle] = OrderedDict()
+_drained: list[ModelHandle] = []
+_handles_lock = threading.Lock()
+# One lock per model: a cold load never waits for another model's load
+_load_locks: dict[str, threading.Lock] = {}
+
+
+def _load_handle(model_key: str, version: ModelVersion) -> ModelHandle:
+    lock_fd = lock_model(model_key, version)
+    try:
+        runner = ONNXInference(model_key, version)
+        runner.warmup()
+    except BaseException:
+        os.close(lock_fd)
+        raise
+    return ModelHandle(model_key, runner, version, lock_fd)
+
+
+def _release(handle: ModelHandle) -> None:
+    # Must be called with _handles_lock held
+    handle.runner = None
+    if handle.lock_fd is not None:
+        os.close(handle.lock_fd)
+        handle.lock_fd = None
+    _drained.append(handle)
+
+
+def _retire(handle: ModelHandle) -> None:
+    # Must be called with _handles_lock held
+    handle.retired = True
+    if handle.in_flight == 0:
+        _release(handle)
+
+
+def _install(model_key: str, handle: ModelHandle) -> None:
+    with _handles_lock:
+        old_handle = _handles.pop(model_key, None)
+        _handles[model_key] = handle
+        if old_handle is not None:
+            _retire(old_handle)
+        while len(_handles) > settings.MODEL_CACHE_SIZE:
+            _, evicted = _handles.popitem(last=False)
+            _retire(evicted)
+
+
+def _get_handle(model_key: str) -> ModelHandle:
+    with _handles_lock:
+        handle = _handles.get(model_key)
+        if handle is not None:
+            _handles.move_to_end(model_key)
+            handle.in_flight += 1
+            return handle
+
+    with _handles_lock:
+        load_lock = _load_locks.setdefault(model_key, threading.Lock())
+    with load_lock:
+        with _handles_lock:
+            handle = _handles.get(model_key)
+        if handle is None:
+            handle = _load_handle(model_key, get_model_version(model_key))
+            _install(model_key, handle)
+
+    return _get_handle(model_key)
+
+
+@contextmanager
+def use_model_runner(model_key: str) -> Iterator[ONNXInference]:
+    """
+    Borrow the current runner of a model. A runner swapped out by
+    `refresh_model` stays alive until every borrower has returned it.
+    """
+    handle = _get_handle(model_key)
+    try:
+        assert handle.runner is not None
+        yield handle.runner
+    finally:
+        with _handles_lock:
+            handle.in_flight -= 1
+            if handle.retired and handle.in_flight == 0:
+                _release(handle)
+
+
+def preload_model(model_key: str) -> None:
+    """Load and warm up a model ahead of the first request."""
+    with use_model_runner(model_key):
+        pass
+
+
+def refresh_model(model_key: str) -> bool:
+    """
+    Load the latest version of a model in the calling thread, warm it up and
+    swap it in. No lock is held while loading, so requests (including cold
+    loads of other models) are not delayed. Returns True if a new version was
+    installed.
+    """
+    with _handles_lock:
+        handle = _handles.get(model_key)
+    if handle is None:
+        return False
+
+    version = get_model_version(model_key)
+    if version.tag == handle.version.tag:
+        return False
+
+    logger.info("Loading model %s version %s", model_key, version.tag)
+    _install(model_key, _load_handle(model_key, version))
+    logger.info("Swapped model %s to version %s", model_key, version.tag)
+    return True
+
+
+def prune_models() -> None:
+    """
+    Delete the cached files of model versions whose last handle has been
+    released. A version still locked by a handle of any process sharing the
+    cache (see serve.py), including one being loaded, is left in place.
+    """
+    with _handles_lock:
+        drained = _drained[:]
+        _drained.clear()
+
+    for handle in drained:
+        if remove_model(handle.model_key, handle.version):
+            logger.info(
+                "Removed model %s version %s", handle.model_key, handle.version.tag
+            )
+
+
+def refresh_models() -> None:
+    with _handles_lock:
+        model_keys = list(_handles)
+
+    for model_key in model_keys:
+        try:
+            refresh_model(model_key)
+        except Exception:
+            logger.exception("Failed to refresh model %s", model_key)
+
+    try:
+        prune_models()
+    except Exception:
+        logger.exception("Failed to prune the model cache")
+
+
+def get_admission_gate(model_key: str) -> AdmissionGate:
+    if model_key not in _admission_gates:
+        _admission_gates[model_key] = AdmissionGate(
+            model_key,
+            max_concurrency=settings.MODEL_MAX_CONCURRENCY,
+            max_queue_size=settings.MODEL_MAX_QUEUE_SIZE,
+            queue_timeout=settings.MODEL_QUEUE_TIMEOUT,
+            retry_after=settings.MODEL_RETRY_AFTER,
+        )
+    return _admission_gates[model_key]
+
+
+def get_admission_gates() -> list[AdmissionGate]:
+    return list(_admission_gates.values())
@@ -1,82 +1,173 @@
+import fcntl
 import json
+import os
+import shutil
 import tempfile
 import zipfile
 from pathlib import Path
-from typing import Dict
+from typing import Any, Dict
 
 import numpy as np
-import onnxruntime as ort
 
-from backend.utils.s3_loader import download_model
+from backend.utils.s3_loader import ModelVersion, download_model, model_cache_path
+
+HUB_MATRIX_FILE = "hub_matrix.npy"
+HUB_NAMES_FILE = "hub_names.json"
+
+
+def _build_hub_matrix(model_dir: Path) -> None:
+    with open(model_dir / "hub_encoder.json", "r", encoding="utf-8") as f:
+        hub_dict = json.load(f)
+
+    hub_names = list(hub_dict.keys())
+    hub_matrix = np.array([hub_dict[hub] for hub in hub_names], dtype=np.float32)
+    if not hub_names:
+        hub_matrix = hub_matrix.reshape(0, 0)
+
+    np.save(model_dir / HUB_MATRIX_FILE, hub_matrix)
+    with open(model_dir / HUB_NAMES_FILE, "w", encoding="utf-8") as f:
+        json.dump(hub_names, f, ensure_ascii=False)
+
+
+def prepare_model(model_key: str | Path, version: ModelVersion | None = None) -> Path:
+    """
+    Download and extract a model archive into the local cache and convert its
+    hub encoder into a memory-mappable matrix. Safe to call from several
+    processes: the extracted directory appears atomically.
+    """
+    model_path = Path(download_model(str(model_key), version))
+    model_dir = model_path.with_suffix("")
+    if model_dir.exists():
+        return model_dir
+
+    tmp_dir = Path(tempfile.mkdtemp(dir=model_path.parent))
+    try:
+        with zipfile.ZipFile(model_path, "r") as zipf:
+            zipf.extractall(tmp_dir)
+        _build_hub_matrix(tmp_dir)
+        os.rename(tmp_dir, model_dir)
+    except OSError:
+        if not model_dir.exists():
+            raise
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    return model_dir
+
+
+def _lock_path(model_key: str | Path, version: ModelVersion) -> str:
+    return f"{model_cache_path(str(model_key), version)}.lock"
+
+
+def _is_current(fd: int, path: str) -> bool:
+    # A remover unlinks the lock file, so a lock taken on it is stale
+    try:
+        return os.fstat(fd).st_ino == os.stat(path).st_ino
+    except FileNotFoundError:
+        return False
+
+
+def lock_model(model_key: str | Path, version: ModelVersion) -> int:
+    """
+    Take a shared lock on the cached files of a model version and return its
+    file descriptor. While any process holds it, `remove_model` leaves the
+    version alone; close the descriptor to release it.
+    """
+    lock_path = _lock_path(model_key, version)
+    while True:
+        os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+        try:
+            fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        except FileNotFoundError:
+            # The version directory was removed in between
+            continue
+        fcntl.flock(fd, fcntl.LOCK_SH)
+        if _is_current(fd, lock_path):
+            return fd
+        os.close(fd)
+
+
+def remove_model(model_key: str | Path, version: ModelVersion) -> bool:
+    """
+    Delete the cached archive and extracted directory of a model version, and
+    the version directory once nothing else is left in it. Nothing is removed
+    while a process holds the version's lock (see `lock_model`); returns
+    whether the files were removed.
+    """
+    lock_path = _lock_path(model_key, version)
+    try:
+        fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    except FileNotFoundError:
+        return True
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        if not _is_current(fd, lock_path):
+            return False
+
+        model_path = Path(model_cache_path(str(model_key), version))
+        shutil.rmtree(model_path.with_suffix(""), ignore_errors=True)
+        model_path.unlink(missing_ok=True)
+        os.unlink(lock_path)
+    finally:
+        os.close(fd)
+
+    try:
+        model_path.parent.rmdir()
+    except OSError:
+        pass
+    return True
+
+
+def _create_session(model_path: Path) -> Any:
+    # onnxruntime is slow to import, so it is only loaded with the first model
+    import onnxruntime as ort
+
+    sess_options = ort.SessionOptions()
+    sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+    return ort.InferenceSession(
+        str(model_path),
+        sess_options=sess_options,
+        providers=["CPUExecutionProvider"],
+    )
 
 
 class ONNXInference:
 
-    def __init__(self, model_key: str | Path):
-        self.model_path = download_model(model_key)
-
-        self._tmpdir = tempfile.TemporaryDirectory()
-        self._extract_model()
+    def __init__(self, model_key: str | Path, version: ModelVersion | None = None):
+        self._model_dir = prepare_model(model_key, version)
 
         self._load_hub_encoder()
         self._load_text_encoder()
         self._load_predictor()
         self._load_metadata()
 
-    def _extract_model(self) -> None:
-        with zipfile.ZipFile(self.model_path, "r") as zipf:
-            zipf.extractall(self._tmpdir.name)
-
-        self._tmpdir_path = Path(self._tmpdir.name)
-
     def _load_hub_encoder(self) -> None:
-        hub_path = self._tmpdir_path / "hub_encoder.json"
-
-        with open(hub_path, "r", encoding="utf-8") as f:
-            hub_dict = json.load(f)
+        # Read-only memory map: processes serving the same model share the pages
+        self.hub_matrix: np.ndarray = np.load(
+            self._model_dir / HUB_MATRIX_FILE, mmap_mode="r"
+        )
 
-        self.hub_to_vec: Dict[str, np.ndarray] = {
-            hub: np.array(vec, dtype=np.float32) for hub, vec in hub_dict.items()
-        }
+        with open(self._model_dir / HUB_NAMES_FILE, "r", encoding="utf-8") as f:
+            hub_names = json.load(f)
 
-        if self.hub_to_vec:
-            first_vec = next(iter(self.hub_to_vec.values()))
-            self.hub_dim = len(first_vec)
-            self.default_hub_vec = np.zeros(self.hub_dim, dtype=np.float32)
-        else:
-            self.hub_dim = 0
-            self.default_hub_vec = np.array([], dtype=np.float32)
+        self.hub_to_idx: Dict[str, int] = {hub: i for i, hub in enumerate(hub_names)}
+        self.hub_dim = self.hub_matrix.shape[1] if hub_names else 0
+        self.default_hub_vec = np.zeros(self.hub_dim, dtype=np.float32)
 
     def _load_text_encoder(self) -> None:
-        text_encoder_path = self._tmpdir_path / "text_encoder.onnx"
-
-        sess_options = ort.SessionOptions()
-        sess_options.graph_optimization_level = (
-            ort.GraphOptimizationLevel.ORT_ENABLE_ALL
-        )
-
-        self.text_encoder_session = ort.InferenceSession(
-            str(text_encoder_path),
-            sess_options=sess_options,
-            providers=["CPUExecutionProvider"],
+        self.text_encoder_session = _create_session(
+            self._model_dir / "text_encoder.onnx"
         )
 
     def _load_predictor(self) -> None:
-        predictor_path = self._tmpdir_path / "predictor.onnx"
-
-        sess_options = ort.SessionOptions()
-        sess_options.graph_optimization_level = (
-            ort.GraphOptimizationLevel.ORT_ENABLE_ALL
-        )
-
-        self.predictor_session = ort.InferenceSession(
-            str(predictor_path),
-            sess_options=sess_options,
-            providers=["CPUExecutionProvider"],
-        )
+        self.predictor_session = _create_session(self._model_dir / "predictor.onnx")
 
     def _load_metadata(self) -> None:
-        metadata_path = self._tmpdir_path / "metadata.json"
+        metadata_path = self._model_dir / "metadata.json"
 
         with open(metadata_path, "r") as f:
             self.metadata = json.load(f)
@@ -87,18 +178,29 @@ class ONNXInference:
         return result[0].astype(np.float32)
 
     def encode_hub(self, hub: str) -> np.ndarray:
-        if hub in self.hub_to_vec:
-            return self.hub_to_vec[hub].reshape(1, -1)
+        if hub in self.hub_to_idx:
+            return self.hub_matrix[self.hub_to_idx[hub]].reshape(1, -1)
         else:
             return self.default_hub_vec.reshape(1, -1)
 
-    def predict_proba(self, text: str, hub: str) -> float:
-        text_vec = self.encode_text(text)
-        hub_vec = self.encode_hub(hub)
-        combined = np.concatenate([text_vec, hub_vec], axis=1)
+    def _predict_encoded(self, text_vec: np.ndarray, hub: str) -> float:
+        combined = np.concatenate([text_vec, self.encode_hub(hub)], axis=1)
         result = self.predictor_session.run(None, {"input": combined})
         return float(result[0][0])
 
+    def predict_proba(self, text: str, hub: str) -> float:
+        return self._predict_encoded(self.encode_text(text), hub)
+
+    def predict_proba_hubs(self, text: str, hubs: list[str]) -> list[float]:
+        """Score one text against several hubs, encoding the text only once."""
+        text_vec = self.encode_text(text)
+        return [self._predict_encoded(text_vec, hub) for hub in hubs]
+
+    def warmup(self) -> None:
+        """Run one prediction so that lazy session initialisation happens now."""
+        hub = next(iter(self.hub_to_idx), "")
+        self.predict_proba("warmup", hub)
+
     def predict(self, text: str, hub: str) -> int:
         proba = self.predict_proba(text, hub)
         return int(proba > 0.5)
@@ -111,7 +213,3 @@ class ONNXInference:
             results.append(self.predict_proba(text, hub))
 
         return np.array(results)
-
-    def __del__(self) -> None:
-        if hasattr(self, "_tmpdir"):
-            self._tmpdir.cleanup()
@@ -1,17 +1,29 @@
 import os
-
-import boto3
+import re
+from functools import lru_cache
+from typing import Any, NamedTuple
 
 from backend.config import settings
 
-_s3_client = boto3.client(
-    "s3",
-    region_name=settings.AWS_REGION,
-)
+
+class ModelVersion(NamedTuple):
+    tag: str
+    download_args: dict[str, str]
+
+
+@lru_cache(maxsize=1)
+def get_s3_client() -> Any:
+    # boto3 is slow to import, so it is only loaded once S3 is actually used
+    import boto3
+
+    return boto3.client(
+        "s3",
+        region_name=settings.AWS_REGION,
+    )
 
 
 def list_models() -> set[str]:
-    paginator = _s3_client.get_paginator("list_objects_v2")
+    paginator = get_s3_client().get_paginator("list_objects_v2")
 
     models: set[str] = set()
 
@@ -24,13 +36,50 @@ def list_models() -> set[str]:
     return models
 
 
-def download_model(model_key: str) -> str:
-    local_dir = os.path.join("models_cache")
-    os.makedirs(local_dir, exist_ok=True)
-    local_path = os.path.join(local_dir, os.path.basename(model_key))
+def get_model_version(model_key: str) -> ModelVersion:
+    """
+    Resolve the current version of a model archive: the S3 version id on
+    versioned buckets, the ETag otherwise. Only the version id can pin a
+    download; an ETag version is checked again after the download instead.
+    """
+    head = get_s3_client().head_object(Bucket=settings.S3_BUCKET_NAME, Key=model_key)
+
+    version_id = head.get("VersionId")
+    if version_id and version_id != "null":
+        return ModelVersion(tag=version_id, download_args={"VersionId": version_id})
+
+    return ModelVersion(tag=head["ETag"].strip('"'), download_args={})
+
+
+def model_cache_path(model_key: str, version: ModelVersion) -> str:
+    """Local path of a model archive: models_cache/<version tag>/<basename>."""
+    local_dir = os.path.join("models_cache", re.sub(r"[^\w.-]", "_", version.tag))
+    return os.path.join(local_dir, os.path.basename(model_key))
+
+
+def download_model(model_key: str, version: ModelVersion | None = None) -> str:
+    version = version or get_model_version(model_key)
+
+    local_path = model_cache_path(model_key, version)
+    os.makedirs(os.path.dirname(local_path), exist_ok=True)
 
     if not os.path.exists(local_path):
-        _s3_client.download_file(
-            Bucket=settings.S3_BUCKET_NAME, Key=model_key, Filename=local_path
+        partial_path = f"{local_path}.part.{os.getpid()}"
+        get_s3_client().download_file(
+            Bucket=settings.S3_BUCKET_NAME,
+            Key=model_key,
+            Filename=partial_path,
+            ExtraArgs=version.download_args,
         )
+        if "VersionId" not in version.download_args:
+            # download_file does not accept IfMatch, so make sure the object
+            # was not overwritten while it was being downloaded
+            current = get_model_version(model_key)
+            if current.tag != version.tag:
+                os.remove(partial_path)
+                raise RuntimeError(
+                    f"{model_key} changed during download: "
+                    f"expected ETag {version.tag}, got {current.tag}"
+                )
+        os.replace(partial_path, local_path)
     return local_path
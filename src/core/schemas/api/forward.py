@@ -1,6 +1,6 @@
-from typing import List, Optional
+from typing import List, Literal, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class ForwardRequest(BaseModel):
@@ -17,3 +17,21 @@ class HubScore(BaseModel):
 class ForwardResponse(BaseModel):
     result: Optional[List[HubScore]] = None
     error: Optional[str] = None
+
+
+class CompareRequest(BaseModel):
+    model_names: List[str] = Field(min_length=1)
+    text: str
+    hubs: Optional[List[str]] = None
+    fusion: Optional[Literal["mean", "rank"]] = None
+
+
+class ModelScores(BaseModel):
+    model_name: str
+    result: List[HubScore]
+
+
+class CompareResponse(BaseModel):
+    results: Optional[List[ModelScores]] = None
+    fused: Optional[List[HubScore]] = None
+    error: Optional[str] = None
@@ -9,3 +9,16 @@ class ModelItem(BaseModel):
 
 class ModelListResponse(BaseModel):
     models: List[ModelItem]
+
+
+class ModelLoadItem(BaseModel):
+    name: str
+    in_flight: int
+    queued: int
+    rejected: int
+    max_concurrency: int
+    max_queue_size: int
+
+
+class ModelLoadResponse(BaseModel):
+    models: List[ModelLoadItem]
@@ -0,0 +1,116 @@
+"""Pooled and cached HTTP client for the backend API"""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, TypeVar
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from core.schemas.api.forward import ForwardRequest
+from core.schemas.api.history import HistoryResponse
+from core.schemas.api.models import ModelListResponse
+from frontend.config import settings
+
+T = TypeVar("T")
+
+
+class ApiError(Exception):
+    """Backend responded with a non-200 status code."""
+
+    def __init__(self, response: requests.Response):
+        super().__init__(f"API error: {response.status_code}")
+        self.response = response
+
+
+class ApiClient:
+    """
+    Backend client shared by all Streamlit sessions and reruns.
+
+    Keeps a pool of keep-alive connections and caches the model list
+    and the request history for a short time.
+    """
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip("/")
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=settings.pool_maxsize,
+            pool_maxsize=settings.pool_maxsize,
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._cache: dict[str, tuple[float, Any]] = {}
+        # Bumped by invalidate: fetches started before it are not cached
+        self._generation = 0
+        self._cache_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=settings.pool_maxsize)
+
+    def _cached(self, key: str, ttl: float, fetch: Callable[[], T]) -> T:
+        now = time.monotonic()
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            generation = self._generation
+        if cached is not None and now - cached[0] < ttl:
+            return cached[1]  # type: ignore[no-any-return]
+
+        value = fetch()
+        with self._cache_lock:
+            # A background prefetch may finish after an invalidation
+            if generation == self._generation:
+                self._cache[key] = (now, value)
+        return value
+
+    def invalidate(self, key: str | None = None) -> None:
+        with self._cache_lock:
+            self._generation += 1
+            if key is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(key, None)
+
+    def _get(self, path: str, **kwargs: Any) -> requests.Response:
+        response = self.session.get(
+            f"{self.base_url}{path}", timeout=settings.request_timeout, **kwargs
+        )
+        if response.status_code != 200:
+            raise ApiError(response)
+        return response
+
+    def get_models(self) -> list[str]:
+        def fetch() -> list[str]:
+            models_data = ModelListResponse.model_validate(self._get("/models").json())
+            return [model.name for model in models_data.models]
+
+        return self._cached("models", settings.models_cache_ttl, fetch)
+
+    def get_history(self) -> HistoryResponse:
+        def fetch() -> HistoryResponse:
+            return HistoryResponse.model_validate(self._get("/history").json())
+
+        return self._cached("history", settings.history_cache_ttl, fetch)
+
+    def forward(self, request: ForwardRequest) -> requests.Response:
+        response = self.session.post(
+            f"{self.base_url}/forward",
+            json=request.model_dump(),
+            timeout=settings.request_timeout,
+        )
+        self.invalidate("history")
+        return response
+
+    def check_connection(self) -> requests.Response:
+        return self.session.get(f"{self.base_url}/docs", timeout=3)
+
+    def submit(self, fn: Callable[..., T], *args: Any) -> "Future[T]":
+        """Run a client call in the background, e.g. to prefetch tab data."""
+        return self._executor.submit(fn, *args)
+
+
+@lru_cache(maxsize=8)
+def get_api_client(base_url: str) -> ApiClient:
+    return ApiClient(base_url)
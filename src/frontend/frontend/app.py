@@ -1,12 +1,14 @@
 """Habr Article Analyzer Frontend Application"""
 
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
 import requests
 import streamlit as st
+from streamlit.runtime.uploaded_file_manager import UploadedFile
 
 from core.schemas.api.forward import ForwardRequest, ForwardResponse
-from core.schemas.api.history import HistoryResponse
-from core.schemas.api.models import ModelListResponse
+from frontend.api_client import ApiError, get_api_client
 from frontend.config import settings
 
 DEFAULT_API_URL = settings.api_base_url
@@ -30,17 +32,18 @@ if "uploaded_file_name" not in st.session_state:
 
 BASE_API_URL = st.session_state.api_url
 
+api_client = get_api_client(BASE_API_URL)
+# Both tabs are rendered on every rerun, so fetch their data in parallel
+models_future = api_client.submit(api_client.get_models)
+history_future = api_client.submit(api_client.get_history)
+
 
 def load_available_models() -> list[str]:
     """Load available models from API."""
     try:
-        response = requests.get(
-            f"{BASE_API_URL}/models",
-            timeout=settings.request_timeout,
-        )
-        if response.status_code == 200:
-            models_data = ModelListResponse.model_validate(response.json())
-            return [model.name for model in models_data.models]
+        return models_future.result()
+    except ApiError:
+        pass
     except Exception as e:
         st.warning(f"Failed to load models: {e}")
 
@@ -57,24 +60,64 @@ def decode_file_content(bytes_data: bytes) -> str:
     raise ValueError("Failed to decode file with supported encodings")
 
 
-def handle_api_error(response: requests.Response) -> None:
-    """Handle API error responses."""
+def api_error_message(response: requests.Response) -> str:
+    """Describe API error response."""
     error_messages = {
         400: "Invalid request format",
         403: "Model failed to process the data",
         404: "Endpoint not found",
         422: f"Validation error: {response.json()}",
+        429: "Server is overloaded, please retry later",
     }
 
     if response.status_code in error_messages:
-        st.error(error_messages[response.status_code])
+        return error_messages[response.status_code]
     elif response.status_code >= 500:
-        st.error(f"Server error: {response.status_code}")
+        return f"Server error: {response.status_code}"
     else:
-        st.error(f"Unknown error: {response.status_code}")
+        return f"Unknown error: {response.status_code}"
+
+
+def handle_api_error(response: requests.Response) -> None:
+    """Handle API error responses."""
+    st.error(api_error_message(response))
+
+
+def decode_files(files: list[UploadedFile]) -> list[str | Exception]:
+    """
+    Decode uploaded files in parallel, keeping errors per file. Results are in
+    upload order, so files sharing a name stay separate.
+    """
+
+    def decode(file: UploadedFile) -> str | Exception:
+        try:
+            return decode_file_content(file.getvalue())
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor() as executor:
+        return list(executor.map(decode, files))
+
+
+def analyze_text(request_data: ForwardRequest) -> dict[str, float] | str:
+    """Score one text, returning hub scores or an error message."""
+    try:
+        response = api_client.forward(request_data)
+        if response.status_code != 200:
+            return api_error_message(response)
+        result = ForwardResponse.model_validate(response.json())
+        if result.result is None:
+            return result.error or "Empty response"
+        return {item.hub: item.score for item in result.result}
+    except requests.exceptions.ConnectionError:
+        return "Failed to connect to server"
+    except requests.exceptions.Timeout:
+        return "Request timeout"
+    except Exception as e:
+        return f"Error occurred: {e}"
 
 
-tab1, tab2 = st.tabs(["Prediction", "Request History"])
+tab1, tab2, tab3 = st.tabs(["Prediction", "Bulk Analysis", "Request History"])
 
 
 with tab1:
@@ -152,11 +195,7 @@ with tab1:
 
         with st.spinner("Processing request..."):
             try:
-                response = requests.post(
-                    f"{BASE_API_URL}/forward",
-                    json=request_data.model_dump(),
-                    timeout=settings.request_timeout,
-                )
+                response = api_client.forward(request_data)
 
                 if response.status_code == 200:
                     result = ForwardResponse.model_validate(response.json())
@@ -205,40 +244,129 @@ with tab1:
 
 
 with tab2:
+    with st.form("bulk_form"):
+        st.subheader("Bulk Analysis")
+
+        bulk_files = st.file_uploader(
+            "Upload articles (supports .txt and .md):",
+            type=SUPPORTED_FILE_TYPES,
+            accept_multiple_files=True,
+            key="bulk_file_uploader",
+        )
+        bulk_model_name = st.selectbox(
+            "Model name:",
+            options=load_available_models(),
+            index=0,
+            key="bulk_model_name",
+        )
+        bulk_hubs_input = st.text_input(
+            "Enter hubs for comparison (comma-separated):",
+            placeholder="e.g.: cpp, yandex, 1C",
+            help="Leave empty to get top hubs for all available hubs",
+            key="bulk_hubs_input",
+        )
+
+        bulk_submitted = st.form_submit_button("Analyze Files")
+
+    if bulk_submitted and bulk_files:
+        bulk_hubs_list = (
+            [hub.strip() for hub in bulk_hubs_input.split(",")]
+            if bulk_hubs_input
+            else None
+        )
+        decoded = decode_files(bulk_files)
+        # Keyed by upload index: several files may share a name
+        results: dict[int, dict[str, float] | str] = {
+            index: f"Error reading file: {text}"
+            for index, text in enumerate(decoded)
+            if isinstance(text, Exception)
+        }
+        pending = {
+            index: ForwardRequest(
+                model_name=bulk_model_name.strip(),
+                text=text,
+                hubs=bulk_hubs_list,
+            )
+            for index, text in enumerate(decoded)
+            if isinstance(text, str)
+        }
+
+        progress = st.progress(0.0, text="Analyzing files...")
+        indices = list(pending)
+        for start in range(0, len(indices), settings.bulk_batch_size):
+            batch = indices[start : start + settings.bulk_batch_size]
+            futures = {
+                index: api_client.submit(analyze_text, pending[index])
+                for index in batch
+            }
+            for index, future in futures.items():
+                results[index] = future.result()
+            done = start + len(batch)
+            progress.progress(
+                done / len(indices), text=f"Analyzed {done} of {len(indices)} files"
+            )
+        progress.empty()
+
+        metadata_columns = ["file", "best_hub", "best_score", "error"]
+        rows = []
+        for index, file in enumerate(bulk_files):
+            result = results[index]
+            # Hub scores are prefixed, so a hub named like a metadata column
+            # can't overwrite it
+            row: dict[str, str | float | None] = {}
+            if isinstance(result, dict) and result:
+                row.update({f"hub: {hub}": score for hub, score in result.items()})
+                best_hub, best_score = max(result.items(), key=lambda item: item[1])
+                row.update(best_hub=best_hub, best_score=best_score, error=None)
+            else:
+                row.update(best_hub=None, best_score=None, error=result or "No scores")
+            row["file"] = file.name
+            rows.append(row)
+
+        bulk_df = pd.DataFrame(rows)
+        bulk_df = bulk_df[
+            metadata_columns
+            + [column for column in bulk_df.columns if column not in metadata_columns]
+        ].sort_values("best_score", ascending=False, na_position="last")
+        st.dataframe(bulk_df.reset_index(drop=True), use_container_width=True)
+
+    elif bulk_submitted:
+        st.warning("Please upload files for analysis")
+
+
+with tab3:
     st.header("Request History")
 
     if st.button("Refresh History", key="refresh_history"):
+        api_client.invalidate("history")
         st.rerun()
 
     try:
-        history_response = requests.get(
-            f"{BASE_API_URL}/history",
-            timeout=settings.request_timeout,
+        # A submitted request invalidates the prefetched history
+        history_data = (
+            api_client.get_history()
+            if submitted or bulk_submitted
+            else history_future.result()
         )
 
-        if history_response.status_code == 200:
-            history_data = HistoryResponse.model_validate(history_response.json())
-
-            if history_data.history:
-                history_df = pd.DataFrame(
-                    [
-                        {
-                            "query_id": str(item.query_id),
-                            "endpoint": item.endpoint,
-                            "status_code": item.code_status,
-                            "timestamp": item.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
-                        }
-                        for item in history_data.history
-                    ]
-                )
-                st.dataframe(history_df, use_container_width=True)
-            else:
-                st.info("Request history is empty")
-        else:
-            st.error(
-                f"Failed to load history. Error code: {history_response.status_code}"
+        if history_data.history:
+            history_df = pd.DataFrame(
+                [
+                    {
+                        "query_id": str(item.query_id),
+                        "endpoint": item.endpoint,
+                        "status_code": item.code_status,
+                        "timestamp": item.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+                    }
+                    for item in history_data.history
+                ]
             )
+            st.dataframe(history_df, use_container_width=True)
+        else:
+            st.info("Request history is empty")
 
+    except ApiError as e:
+        st.error(f"Failed to load history. Error code: {e.response.status_code}")
     except requests.exceptions.ConnectionError:
         st.error("Failed to connect to server. Please check your connection settings.")
     except requests.exceptions.Timeout:
@@ -265,7 +393,7 @@ with st.sidebar:
 
     if st.button("Test API Connection", use_container_width=True):
         try:
-            response = requests.get(f"{st.session_state.api_url}/docs", timeout=3)
+            response = get_api_client(st.session_state.api_url).check_connection()
             if response.status_code == 200:
                 st.success("Connection successful")
             else:
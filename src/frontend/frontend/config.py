@@ -8,6 +8,10 @@ class FrontendSettings(BaseSettings):
     default_model_name: str = "BoWDSSM"
     max_file_size_mb: int = 10
     request_timeout: int = 30
+    pool_maxsize: int = 10
+    models_cache_ttl: int = 60
+    history_cache_ttl: int = 5
+    bulk_batch_size: int = 8
 
     class Config:
         env_file = ".env"
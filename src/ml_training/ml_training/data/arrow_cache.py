@@ -0,0 +1,249 @@
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Iterable, Iterator, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+
+from ml_training.data.jsonl_zst import MANIFEST_NAME, json_dumps, json_loads
+
+# Field metadata marking columns stored as JSON text
+ENCODING_KEY = b"encoding"
+JSON_ENCODING = b"json"
+
+
+def cache_file_path(
+    source: Path, cache_dir: Path, exclude_columns: Iterable[str]
+) -> Path:
+    """
+    Cache location for a source file. The name includes a fingerprint of the
+    source (path, size, mtime) and of the excluded columns, so a changed source
+    never reuses a stale cache.
+    """
+    stat = (source / MANIFEST_NAME).stat() if source.is_dir() else source.stat()
+    fingerprint = "|".join(
+        [
+            str(source.resolve()),
+            str(stat.st_size),
+            str(stat.st_mtime_ns),
+            ",".join(sorted(exclude_columns)),
+        ]
+    )
+    key = hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()[:16]
+    return cache_dir / f"{source.name}.{key}.arrow"
+
+
+def _is_native(arrow_type: pa.DataType) -> bool:
+    if pa.types.is_list(arrow_type) or pa.types.is_large_list(arrow_type):
+        return pa.types.is_string(arrow_type.value_type)
+    return (
+        pa.types.is_integer(arrow_type)
+        or pa.types.is_floating(arrow_type)
+        or pa.types.is_boolean(arrow_type)
+        or pa.types.is_string(arrow_type)
+        or pa.types.is_large_string(arrow_type)
+    )
+
+
+def _json_field(name: str) -> pa.Field:
+    return pa.field(name, pa.large_string(), metadata={ENCODING_KEY: JSON_ENCODING})
+
+
+def _is_json_field(field: pa.Field) -> bool:
+    return bool(field.metadata) and field.metadata.get(ENCODING_KEY) == JSON_ENCODING
+
+
+def _infer_field(name: str, values: List[Any]) -> pa.Field:
+    try:
+        arrow_type = pa.array(values, from_pandas=True).type
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return _json_field(name)
+
+    # All-missing columns stay untyped until a later batch brings values
+    if pa.types.is_null(arrow_type) or _is_native(arrow_type):
+        return pa.field(name, arrow_type)
+    # Nested or mixed values keep their exact Python form as JSON text
+    return _json_field(name)
+
+
+def _merge_fields(current: pa.Field, new: pa.Field) -> pa.Field:
+    """
+    Field able to hold the values of both: numeric types are widened and any
+    other conflict falls back to JSON text, so no value is lost.
+    """
+    if current.equals(new, check_metadata=True) or pa.types.is_null(new.type):
+        return current
+    if pa.types.is_null(current.type):
+        return new
+    if not (_is_json_field(current) or _is_json_field(new)):
+        try:
+            merged = pa.unify_schemas(
+                [pa.schema([current]), pa.schema([new])], promote_options="permissive"
+            ).field(0)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            pass
+        else:
+            if _is_native(merged.type):
+                return merged
+    return _json_field(current.name)
+
+
+def _merge_schemas(current: Optional[pa.Schema], fields: List[pa.Field]) -> pa.Schema:
+    merged = {} if current is None else {field.name: field for field in current}
+    for field in fields:
+        old = merged.get(field.name)
+        merged[field.name] = field if old is None else _merge_fields(old, field)
+    return pa.schema(list(merged.values()))
+
+
+def _to_array(field: pa.Field, values: List[Any]) -> pa.Array:
+    if _is_json_field(field):
+        values = [
+            None if value is None else json_dumps(value).decode("utf-8")
+            for value in values
+        ]
+    return pa.array(values, type=field.type, from_pandas=True)
+
+
+def _conform_column(column: pa.Array, source: pa.Field, target: pa.Field) -> pa.Array:
+    """Convert a column written with an older schema to the final one."""
+    if source.equals(target, check_metadata=True):
+        return column
+    if _is_json_field(target) and not _is_json_field(source):
+        return _to_array(target, column.to_pylist())
+    return column.cast(target.type)
+
+
+class ArrowCacheWriter:
+    """
+    Writes batches of columns (as produced by ColumnBatchBuilder.flush) into an
+    Arrow IPC file. A batch with new columns or wider types extends the schema:
+    batches are appended to a new part file from then on, and `close` rewrites
+    the parts into the final schema.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.schema: Optional[pa.Schema] = None
+        self._writer: Optional[pa.ipc.RecordBatchFileWriter] = None
+        self._parts: List[Path] = []
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._tmp_path = self._new_tmp_path()
+
+    def _new_tmp_path(self) -> Path:
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        os.close(fd)
+        return Path(tmp_path)
+
+    def _start_part(self, schema: pa.Schema) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._parts.append(self._new_tmp_path())
+        else:
+            self._parts.append(self._tmp_path)
+        self.schema = schema
+        self._writer = pa.ipc.new_file(str(self._parts[-1]), schema)
+
+    def write(self, data: dict[str, List[Any]], size: int) -> None:
+        fields = [_infer_field(name, values) for name, values in data.items()]
+        schema = _merge_schemas(self.schema, fields)
+        if self.schema is None or not schema.equals(self.schema, check_metadata=True):
+            self._start_part(schema)
+
+        assert self._writer is not None and self.schema is not None
+        arrays = [
+            _to_array(field, data.get(field.name, [None] * size))
+            for field in self.schema
+        ]
+        self._writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+
+    def _merge_parts(self) -> None:
+        assert self.schema is not None
+        merged_path = self._new_tmp_path()
+        try:
+            with pa.ipc.new_file(str(merged_path), self.schema) as writer:
+                for part in self._parts:
+                    with pa.memory_map(str(part), "r") as source:
+                        reader = pa.ipc.open_file(source)
+                        for i in range(reader.num_record_batches):
+                            writer.write_batch(self._conform_batch(reader.get_batch(i)))
+        except BaseException:
+            merged_path.unlink(missing_ok=True)
+            raise
+        for part in self._parts:
+            part.unlink(missing_ok=True)
+        self._parts = [merged_path]
+
+    def _conform_batch(self, batch: pa.RecordBatch) -> pa.RecordBatch:
+        assert self.schema is not None
+        arrays = []
+        for field in self.schema:
+            index = batch.schema.get_field_index(field.name)
+            if index == -1:
+                arrays.append(pa.nulls(batch.num_rows, field.type))
+            else:
+                arrays.append(
+                    _conform_column(
+                        batch.column(index), batch.schema.field(index), field
+                    )
+                )
+        return pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+    def close(self) -> None:
+        if self._writer is None:
+            self._start_part(pa.schema([]))
+        assert self._writer is not None
+        self._writer.close()
+        if len(self._parts) > 1:
+            self._merge_parts()
+        os.replace(self._parts[0], self.path)
+
+    def abort(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        for part in self._parts:
+            part.unlink(missing_ok=True)
+        self._tmp_path.unlink(missing_ok=True)
+
+
+def _column_to_pandas(field: pa.Field, column: pa.ChunkedArray) -> Any:
+    if _is_json_field(field):
+        return [
+            None if value is None else json_loads(value) for value in column.to_pylist()
+        ]
+    if pa.types.is_list(field.type) or pa.types.is_large_list(field.type):
+        return column.to_pylist()
+    return column.to_pandas()
+
+
+def iter_arrow_cache(
+    path: Path,
+    columns: Optional[List[str]],
+    exclude_columns: Iterable[str],
+    batch_size: int,
+) -> Iterator[pd.DataFrame]:
+    """
+    Iterate over a memory-mapped Arrow cache in DataFrame batches, converting
+    only the selected columns.
+    """
+    exclude = set(exclude_columns)
+    with pa.memory_map(str(path), "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+
+        names = table.column_names if columns is None else columns
+        names = [name for name in names if name not in exclude]
+
+        for offset in range(0, table.num_rows, batch_size):
+            chunk = table.slice(offset, batch_size)
+            data: dict[str, Any] = {}
+            for name in names:
+                index = chunk.schema.get_field_index(name)
+                if index == -1:
+                    data[name] = [None] * chunk.num_rows
+                else:
+                    data[name] = _column_to_pandas(
+                        chunk.schema.field(index), chunk.column(index)
+                    )
+            yield pd.DataFrame(data, index=pd.RangeIndex(chunk.num_rows))
@@ -0,0 +1,178 @@
+import json
+import pickle
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+
+def _encodings(value: Any) -> List[bytes]:
+    """JSON representations of a value as it may appear in a raw line."""
+    return list(
+        {
+            json.dumps(value, ensure_ascii=True).encode("utf-8"),
+            json.dumps(value, ensure_ascii=False).encode("utf-8"),
+        }
+    )
+
+
+class RowFilter(ABC):
+    """
+    Row predicate for HabrDataset.
+
+    `byte_hints` are byte strings of which at least one must occur in the raw
+    line for the row to match; lines without any of them are skipped before
+    JSON decoding. None means no cheap pre-check is possible.
+    """
+
+    column: Optional[str] = None
+    byte_hints: Optional[List[bytes]] = None
+
+    @abstractmethod
+    def matches(self, record: Dict[str, Any]) -> bool:
+        pass
+
+    def mask(self, df: pd.DataFrame) -> np.ndarray:
+        """Vectorized version of `matches` over a DataFrame batch."""
+        return np.array(
+            [self.matches(record) for record in df.to_dict(orient="records")],
+            dtype=bool,
+        )
+
+
+class Eq(RowFilter):
+    """Column equals the value, e.g. Eq("language", "ru")."""
+
+    def __init__(self, column: str, value: Any):
+        self.column = column
+        self.value = value
+        self.byte_hints = _encodings(value) if isinstance(value, str) else None
+
+    def matches(self, record: Dict[str, Any]) -> bool:
+        return bool(record.get(self.column) == self.value)
+
+    def mask(self, df: pd.DataFrame) -> np.ndarray:
+        return (df[self.column] == self.value).to_numpy(dtype=bool)
+
+
+class In(RowFilter):
+    """Column value is one of the values, e.g. In("language", ["ru", "en"])."""
+
+    def __init__(self, column: str, values: Iterable[Any]):
+        self.column = column
+        self.values = set(values)
+        if all(isinstance(value, str) for value in self.values):
+            self.byte_hints = [h for value in self.values for h in _encodings(value)]
+
+    def matches(self, record: Dict[str, Any]) -> bool:
+        return record.get(self.column) in self.values
+
+    def mask(self, df: pd.DataFrame) -> np.ndarray:
+        return df[self.column].isin(self.values).to_numpy(dtype=bool)
+
+
+class Between(RowFilter):
+    """
+    Column value is within [low, high] (None = unbounded), e.g.
+    Between("time_published", 1609459200, 1640995200).
+    """
+
+    def __init__(self, column: str, low: Any = None, high: Any = None):
+        self.column = column
+        self.low = low
+        self.high = high
+
+    def matches(self, record: Dict[str, Any]) -> bool:
+        value = record.get(self.column)
+        if value is None:
+            return False
+        if self.low is not None and value < self.low:
+            return False
+        if self.high is not None and value > self.high:
+            return False
+        return True
+
+    def mask(self, df: pd.DataFrame) -> np.ndarray:
+        values = df[self.column]
+        result = values.notna()
+        if self.low is not None:
+            result &= values >= self.low
+        if self.high is not None:
+            result &= values <= self.high
+        return result.to_numpy(dtype=bool)
+
+
+class ContainsAny(RowFilter):
+    """List column shares at least one value, e.g. ContainsAny("hubs", ["python"])."""
+
+    def __init__(self, column: str, values: Iterable[str]):
+        self.column = column
+        self.values = set(values)
+        self.byte_hints = [h for value in self.values for h in _encodings(value)]
+
+    def matches(self, record: Dict[str, Any]) -> bool:
+        items = record.get(self.column)
+        if items is None:
+            return False
+        if isinstance(items, str):
+            items = [items]
+        return not self.values.isdisjoint(items)
+
+    def mask(self, df: pd.DataFrame) -> np.ndarray:
+        return np.array(
+            [self.matches({self.column: items}) for items in df[self.column]],
+            dtype=bool,
+        )
+
+
+class Predicate(RowFilter):
+    """Arbitrary function of the whole record."""
+
+    def __init__(self, function: Callable[[Dict[str, Any]], bool]):
+        self.function = function
+
+    def matches(self, record: Dict[str, Any]) -> bool:
+        return bool(self.function(record))
+
+
+Filter = Union[RowFilter, Callable[[Dict[str, Any]], bool]]
+
+
+def as_row_filters(filters: Optional[Sequence[Filter]]) -> List[RowFilter]:
+    return [
+        item if isinstance(item, RowFilter) else Predicate(item)
+        for item in filters or []
+    ]
+
+
+def line_may_match(line: bytes, filters: List[RowFilter]) -> bool:
+    """Cheap byte-level pre-check: False only if the line can't match."""
+    for row_filter in filters:
+        hints = row_filter.byte_hints
+        if hints is not None and not any(hint in line for hint in hints):
+            return False
+    return True
+
+
+def record_matches(record: Dict[str, Any], filters: List[RowFilter]) -> bool:
+    return all(row_filter.matches(record) for row_filter in filters)
+
+
+def is_picklable(row_filter: RowFilter) -> bool:
+    """Whether the filter can be sent to a worker process (lambdas can't)."""
+    try:
+        pickle.dumps(row_filter)
+    except (pickle.PicklingError, AttributeError, TypeError):
+        return False
+    return True
+
+
+def filter_columns(filters: List[RowFilter]) -> Optional[List[str]]:
+    """Columns the filters read, None if some filter needs the whole record."""
+    columns = []
+    for row_filter in filters:
+        if row_filter.column is None:
+            return None
+        columns.append(row_filter.column)
+    return columns
@@ -1,70 +1,126 @@
 import logging
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Optional, Tuple
 
 import numpy as np
-import pandas as pd
 from tqdm import tqdm
 
 from ml_training.data.habr_dataset import HabrDataset
+from ml_training.data.hub_vocabulary import HubCodes, HubVocabulary
+from ml_training.data.pair_dataset import PairDatasetWriter
 from ml_training.settings import data_settings, settings
-from ml_training.utils import save_jsonl_zst
 
 logger = logging.getLogger("generate_negatives")
 
 
-def main(input_path: Optional[Path] = None, output_path: Optional[Path] = None) -> None:
-    logger.info("Starting to generate negatives")
-
-    input_path = input_path or (settings.raw_data_dir / "train.jsonl.zst")
-    output_path = output_path or (
-        settings.raw_data_dir / "train_with_negatives.jsonl.zst"
-    )
-
-    columns = ["id", "text", "hubs"]
-    logger.info("Loading dataset")
-    dataset = HabrDataset(
-        path=input_path, columns=columns, batch_size=data_settings.batch_size
-    )
-
-    all_rows: List[pd.DataFrame] = []
+def count_hubs(dataset: HabrDataset) -> Dict[str, int]:
     hub_counts: Dict[str, int] = {}
     for batch_df in dataset:
         for hubs in batch_df["hubs"]:
             for hub in hubs:
                 hub_counts[hub] = hub_counts.get(hub, 0) + 1
-        all_rows.append(batch_df)
-
-    df = pd.concat(all_rows, ignore_index=True)
-    top_hubs = [
-        hub
-        for hub, _ in sorted(hub_counts.items(), key=lambda x: -x[1])[
-            : data_settings.top_hubs_count
-        ]
-    ]
-
-    new_rows = []
-    for _, row in tqdm(df.iterrows(), total=len(df), desc="Generating negatives"):
-        text = row["text"]
-        positive_hubs = row["hubs"]
-        num_pos = min(len(positive_hubs), data_settings.max_positives)
-        sampled_positives = list(
-            np.random.choice(positive_hubs, num_pos, replace=False)
-        )
+    return hub_counts
+
+
+def _sample_positives(
+    rows: np.ndarray, codes: np.ndarray, max_positives: int, rng: np.random.Generator
+) -> Tuple[np.ndarray, np.ndarray]:
+    # Shuffle hubs within every row and keep the first max_positives of each.
+    order = np.lexsort((rng.random(len(codes)), rows))
+    rows, codes = rows[order], codes[order]
+    rank = np.arange(len(rows)) - np.searchsorted(rows, rows, side="left")
+    keep = rank < max_positives
+    return rows[keep], codes[keep]
 
-        negative_candidates = [h for h in top_hubs if h not in positive_hubs]
-        num_neg = min(len(negative_candidates), data_settings.num_negatives)
-        sampled_negatives = list(
-            np.random.choice(negative_candidates, num_neg, replace=False)
-        )
 
-        for hub in sampled_positives:
-            new_rows.append({"text": text, "hub": hub, "label": 1})
-        for hub in sampled_negatives:
-            new_rows.append({"text": text, "hub": hub, "label": 0})
+def _sample_negatives(
+    n_rows: int,
+    rows: np.ndarray,
+    codes: np.ndarray,
+    top_count: int,
+    num_negatives: int,
+    rng: np.random.Generator,
+) -> Tuple[np.ndarray, np.ndarray]:
+    k = min(num_negatives, top_count)
+    if n_rows == 0 or k <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
 
-    new_df = pd.DataFrame(new_rows)
-    save_jsonl_zst(new_df, output_path)
+    # Random key per (row, top hub); positives are excluded with an infinite key
+    # and the k smallest keys of every row are a uniform sample without replacement.
+    keys = rng.random((n_rows, top_count))
+    is_top = codes < top_count
+    keys[rows[is_top], codes[is_top]] = np.inf
+    picked = np.argpartition(keys, k - 1, axis=1)[:, :k]
+    valid = np.isfinite(np.take_along_axis(keys, picked, axis=1))
+    neg_rows = np.broadcast_to(np.arange(n_rows)[:, None], picked.shape)[valid]
+    return neg_rows, picked[valid]
+
+
+def sample_pairs(
+    hub_codes: HubCodes,
+    top_count: int,
+    rng: np.random.Generator,
+    max_positives: int = data_settings.max_positives,
+    num_negatives: int = data_settings.num_negatives,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Sample positive and negative hubs for a batch of articles.
+
+    Positives are drawn from the article's own hubs, negatives from the
+    `top_count` most frequent hubs (ids below `top_count` in a vocabulary built
+    by HubVocabulary.from_counts) the article does not belong to. Returns
+    (row, hub id, label) arrays grouped by row with positives first.
+    """
+    rows, codes = hub_codes.row_indices(), hub_codes.ids.astype(np.int64)
+    pos_rows, pos_codes = _sample_positives(rows, codes, max_positives, rng)
+    neg_rows, neg_codes = _sample_negatives(
+        hub_codes.n_docs, rows, codes, top_count, num_negatives, rng
+    )
+
+    pair_rows = np.concatenate([pos_rows, neg_rows])
+    pair_codes = np.concatenate([pos_codes, neg_codes])
+    labels = np.concatenate(
+        [np.ones(len(pos_rows), dtype=np.int8), np.zeros(len(neg_rows), dtype=np.int8)]
+    )
+    order = np.argsort(pair_rows, kind="stable")
+    return pair_rows[order], pair_codes[order], labels[order]
+
+
+def batch_rng(seed: int, batch_idx: int) -> np.random.Generator:
+    """Independent RNG stream per batch, regardless of which process handles it."""
+    return np.random.default_rng([seed, batch_idx])
+
+
+def main(input_path: Optional[Path] = None, output_path: Optional[Path] = None) -> None:
+    logger.info("Starting to generate negatives")
+
+    input_path = input_path or (settings.raw_data_dir / "train.jsonl.zst")
+    output_path = output_path or (settings.raw_data_dir / "train_pairs")
+
+    logger.info("Counting hubs")
+    hub_counts = count_hubs(
+        HabrDataset(
+            path=input_path, columns=["hubs"], batch_size=data_settings.batch_size
+        )
+    )
+    vocabulary = HubVocabulary.from_counts(hub_counts)
+    top_count = min(data_settings.top_hubs_count, len(vocabulary))
+
+    dataset = HabrDataset(
+        path=input_path,
+        columns=["id", "text", "hubs"],
+        batch_size=data_settings.batch_size,
+    )
+    with PairDatasetWriter(output_path, vocabulary) as writer:
+        for batch_idx, batch_df in enumerate(
+            tqdm(dataset, desc="Generating negatives")
+        ):
+            rows, codes, labels = sample_pairs(
+                vocabulary.encode(batch_df["hubs"], grow=False),
+                top_count,
+                batch_rng(data_settings.random_seed, batch_idx),
+            )
+            writer.write_batch(batch_df[["id", "text"]], rows, codes, labels)
     logger.info("Saved the result: %s", output_path)
 
 
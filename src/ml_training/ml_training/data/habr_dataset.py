@@ -1,12 +1,87 @@
-import io
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from pathlib import Path
-from typing import Iterator, List, Optional, Union
+from typing import (
+    Any,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Union,
+)
 
-import jsonlines
+import numpy as np
 import pandas as pd
-import zstandard as zstd
 from tqdm import tqdm
 
+from ml_training.data.filters import (
+    Filter,
+    RowFilter,
+    as_row_filters,
+    filter_columns,
+    is_picklable,
+    line_may_match,
+    record_matches,
+)
+from ml_training.data.jsonl_zst import (
+    ColumnBatchBuilder,
+    ReadUnit,
+    iter_jsonl_zst_lines,
+    iter_unit_lines,
+    json_loads,
+    list_read_units,
+    list_shards,
+    read_frame_table,
+)
+from ml_training.data.record_index import RecordIndex
+
+
+def _decode_matching(
+    lines: Iterable[bytes], filters: List[RowFilter]
+) -> Iterator[Dict[str, Any]]:
+    for line in lines:
+        # Byte-level pre-check skips most non-matching lines before decoding
+        if filters and not line_may_match(line, filters):
+            continue
+        obj = json_loads(line)
+        if filters and not record_matches(obj, filters):
+            continue
+        yield obj
+
+
+def _read_unit(
+    unit: ReadUnit,
+    columns: Optional[List[str]],
+    exclude_columns: List[str],
+    filters: List[RowFilter],
+) -> pd.DataFrame:
+    builder = ColumnBatchBuilder(columns, exclude_columns)
+    for obj in _decode_matching(iter_unit_lines(unit), filters):
+        builder.append(obj)
+    return builder.build()
+
+
+def _rebatch(frames: Iterable[pd.DataFrame], batch_size: int) -> Iterator[pd.DataFrame]:
+    pending: List[pd.DataFrame] = []
+    pending_rows = 0
+    for df in frames:
+        pending.append(df)
+        pending_rows += len(df)
+        if pending_rows < batch_size:
+            continue
+        merged = pd.concat(pending, ignore_index=True)
+        for start in range(0, len(merged) - batch_size + 1, batch_size):
+            yield merged.iloc[start : start + batch_size].reset_index(drop=True)
+        rest = merged.iloc[len(merged) - len(merged) % batch_size :]
+        pending = [rest.reset_index(drop=True)]
+        pending_rows = len(rest)
+
+    if pending_rows:
+        yield pd.concat(pending, ignore_index=True)
+
 
 class HabrDataset:
     """
@@ -21,6 +96,24 @@ class HabrDataset:
 
         for batch_df in dataset:
             print(batch_df.head())
+
+    `path` may also be a sharded directory written by save_jsonl_zst. With
+    `num_workers` > 1, shards and zstd frames are decoded in parallel processes;
+    batches keep the file order.
+
+    `len(dataset)` is the number of records and `dataset[i]` /
+    `dataset.get_by_id(article_id)` return single records. Both use frame
+    tables and a sidecar index that is built on first use. The index is saved
+    in `index_dir` (by default `cache_dir`, or next to the data when neither is
+    set); with `save_index=False` it is only kept in memory.
+
+    `filters` keep only matching rows, e.g. [Eq("language", "ru"),
+    ContainsAny("hubs", ["python"])] from ml_training.data.filters. They are
+    checked on raw lines and decoded records, before DataFrames are built.
+    Positional access and len() ignore filters.
+
+    With `cache_dir` set, the first iteration converts the file into a columnar
+    Arrow cache; later iterations memory-map it and decode only selected columns.
     """
 
     # Default columns to exclude (largest fields)
@@ -32,6 +125,11 @@ class HabrDataset:
         columns: Optional[List[str]] = None,
         batch_size: int = 50_000,
         exclude_columns: Optional[List[str]] = None,
+        cache_dir: Optional[Union[str, Path]] = None,
+        num_workers: int = 0,
+        filters: Optional[Sequence[Filter]] = None,
+        index_dir: Optional[Union[str, Path]] = None,
+        save_index: bool = True,
     ):
         """
         Initialize the lazy dataset.
@@ -40,51 +138,213 @@ class HabrDataset:
         :param columns: List of columns to load (None = all)
         :param batch_size: Number of rows per batch
         :param exclude_columns: List of columns to exclude
+        :param cache_dir: Directory for the Arrow cache (None = no cache)
+        :param num_workers: Number of parallel reader processes (0 = sequential)
+        :param filters: Row filters or predicates on record dicts (all must match)
+        :param index_dir: Directory for the record index (None = cache_dir, or
+            next to the data without it)
+        :param save_index: Whether a built record index is written to disk
         """
         self.path = Path(path)
         self.batch_size = batch_size
         self.columns = columns
         self.exclude_columns = exclude_columns or self.DEFAULT_EXCLUDE_COLUMNS
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.num_workers = num_workers
+        self.filters = as_row_filters(filters)
+        if index_dir is not None:
+            self.index_dir: Optional[Path] = Path(index_dir)
+        else:
+            self.index_dir = self.cache_dir
+        self.save_index = save_index
+        self._index: Optional[RecordIndex] = None
 
         if not self.path.exists():
             raise FileNotFoundError(f"Dataset not found: {self.path}")
+        if self.cache_dir is not None:
+            # The Arrow cache doesn't store excluded columns, so they can't be filtered
+            excluded = [
+                f.column
+                for f in self.filters
+                if f.column is not None and f.column in self.exclude_columns
+            ]
+            if excluded:
+                raise ValueError(
+                    f"Filtered columns {excluded} are not in the Arrow cache: "
+                    "remove them from exclude_columns or unset cache_dir"
+                )
 
     def __iter__(self) -> Iterator[pd.DataFrame]:
         """
         Iterator over batches of DataFrames.
         """
-        batch = []
-        with open(self.path, "rb") as fh:
-            dctx = zstd.ZstdDecompressor()
-            with dctx.stream_reader(fh) as reader:
-                text_reader = io.TextIOWrapper(reader, encoding="utf-8")
-                for obj in tqdm(jsonlines.Reader(text_reader), desc="Reading dataset"):
-                    # Remove excluded columns
-                    for col in self.exclude_columns:
-                        obj.pop(col, None)
-
-                    # Keep only requested columns
-                    if self.columns is not None:
-                        obj = {k: v for k, v in obj.items() if k in self.columns}
-
-                    batch.append(obj)
-                    if len(batch) >= self.batch_size:
-                        yield pd.DataFrame(batch)
-                        batch = []
+        if self.cache_dir is not None:
+            yield from self._iter_cache()
+        else:
+            yield from self._iter_jsonl()
+
+    def _iter_jsonl(self) -> Iterator[pd.DataFrame]:
+        if self.num_workers > 1:
+            units = list_read_units(self.path)
+            if len(units) > 1:
+                # Filters that can't be pickled (e.g. lambdas) run in this process
+                local = [f for f in self.filters if not is_picklable(f)]
+                remote = [f for f in self.filters if f not in local]
+                frames = self._iter_units_parallel(
+                    units, self._read_columns(local), remote
+                )
+                yield from _rebatch(self._filter_frames(frames, local), self.batch_size)
+                return
+
+        builder = ColumnBatchBuilder(self.columns, self.exclude_columns)
+        lines = tqdm(iter_jsonl_zst_lines(self.path), desc="Reading dataset")
+        for obj in _decode_matching(lines, self.filters):
+            builder.append(obj)
+            if len(builder) >= self.batch_size:
+                yield builder.build()
 
         # Yield remaining rows
-        if batch:
-            yield pd.DataFrame(batch)
+        if len(builder):
+            yield builder.build()
 
-    def __len__(self) -> int:
+    def _iter_units_parallel(
+        self,
+        units: List[ReadUnit],
+        columns: Optional[List[str]],
+        filters: List[RowFilter],
+    ) -> Iterator[pd.DataFrame]:
+        with ProcessPoolExecutor(max_workers=self.num_workers) as executor:
+            # Bounded window of submitted units keeps memory flat and order fixed
+            window: Deque[Future[pd.DataFrame]] = deque()
+            for unit in tqdm(units, desc="Reading dataset"):
+                window.append(
+                    executor.submit(
+                        _read_unit,
+                        unit,
+                        columns,
+                        self.exclude_columns,
+                        filters,
+                    )
+                )
+                if len(window) >= 2 * self.num_workers:
+                    yield window.popleft().result()
+            while window:
+                yield window.popleft().result()
+
+    @property
+    def cache_path(self) -> Path:
+        from ml_training.data.arrow_cache import cache_file_path
+
+        assert self.cache_dir is not None, "cache_dir is not set"
+        return cache_file_path(self.path, self.cache_dir, self.exclude_columns)
+
+    def build_cache(self) -> Path:
         """
-        Length cannot be determined lazily without reading the entire file.
-        Implementing this would require a full pass through the dataset.
+        Convert the whole file (except excluded columns) into the Arrow cache.
         """
-        raise NotImplementedError(
-            "len(dataset) is not supported for lazy datasets. "
-            "Iterate over batches instead."
+        from ml_training.data.arrow_cache import ArrowCacheWriter
+
+        writer = ArrowCacheWriter(self.cache_path)
+        builder = ColumnBatchBuilder(None, self.exclude_columns)
+        try:
+            for line in tqdm(iter_jsonl_zst_lines(self.path), desc="Building cache"):
+                builder.append(json_loads(line))
+                if len(builder) >= self.batch_size:
+                    size = len(builder)
+                    writer.write(builder.flush(), size)
+            if len(builder):
+                size = len(builder)
+                writer.write(builder.flush(), size)
+        except BaseException:
+            writer.abort()
+            raise
+        writer.close()
+        return self.cache_path
+
+    def _iter_cache(self) -> Iterator[pd.DataFrame]:
+        from ml_training.data.arrow_cache import iter_arrow_cache
+
+        cache_path = self.cache_path
+        if not cache_path.exists():
+            self.build_cache()
+        if not self.filters:
+            yield from iter_arrow_cache(
+                cache_path, self.columns, self.exclude_columns, self.batch_size
+            )
+            return
+
+        frames = iter_arrow_cache(
+            cache_path,
+            self._read_columns(self.filters),
+            self.exclude_columns,
+            self.batch_size,
         )
+        yield from _rebatch(self._filter_frames(frames, self.filters), self.batch_size)
+
+    def _read_columns(self, filters: List[RowFilter]) -> Optional[List[str]]:
+        """Selected columns plus the ones `filters` need to be applied to batches."""
+        if not filters:
+            return self.columns
+        needed_columns = filter_columns(filters)
+        if self.columns is None or needed_columns is None:
+            return None
+        return list(dict.fromkeys(self.columns + needed_columns))
+
+    def _filter_frames(
+        self, frames: Iterable[pd.DataFrame], filters: List[RowFilter]
+    ) -> Iterator[pd.DataFrame]:
+        if not filters:
+            yield from frames
+            return
+        for df in frames:
+            mask = np.ones(len(df), dtype=bool)
+            for row_filter in filters:
+                mask &= row_filter.mask(df)
+            df = df[mask]
+            if self.columns is not None:
+                df = df[[c for c in self.columns if c in df.columns]]
+            yield df.reset_index(drop=True)
+
+    @property
+    def index(self) -> RecordIndex:
+        """Record index, loaded from the sidecar or built with one full scan."""
+        if self._index is None:
+            self._index = RecordIndex.load_or_build(
+                self.path, self.index_dir, save=self.save_index
+            )
+        return self._index
+
+    def __len__(self) -> int:
+        """
+        Number of records. Known from frame tables without reading the data,
+        otherwise taken from the record index.
+        """
+        if self._index is None:
+            frame_tables = [read_frame_table(shard) for shard in list_shards(self.path)]
+            if all(table is not None for table in frame_tables):
+                return sum(table["rows"] for table in frame_tables)  # type: ignore
+        return len(self.index)
+
+    def _project(self, obj: Dict[str, Any]) -> Dict[str, Any]:
+        if self.columns is not None:
+            return {
+                col: obj.get(col)
+                for col in self.columns
+                if col not in self.exclude_columns
+            }
+        return {k: v for k, v in obj.items() if k not in self.exclude_columns}
+
+    def __getitem__(self, position: int) -> Dict[str, Any]:
+        """Record at the given position (negative positions count from the end)."""
+        if position < 0:
+            position += len(self.index)
+        if not 0 <= position < len(self.index):
+            raise IndexError(f"Position {position} is out of range")
+        return self._project(json_loads(self.index.read_line(position)))
+
+    def get_by_id(self, article_id: int) -> Dict[str, Any]:
+        """Record with the given article id."""
+        return self[self.index.position_of(article_id)]
 
     def get_dataframe(self) -> pd.DataFrame:
         all_rows: List[pd.DataFrame] = []
@@ -0,0 +1,155 @@
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Union
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+
+class HubCodes(NamedTuple):
+    """
+    Hub lists of a sequence of documents in CSR form: the hubs of document i
+    are `ids[offsets[i]:offsets[i + 1]]`.
+    """
+
+    offsets: np.ndarray  # int64, len = n_docs + 1
+    ids: np.ndarray  # int32
+
+    @property
+    def n_docs(self) -> int:
+        return len(self.offsets) - 1
+
+    def row(self, i: int) -> np.ndarray:
+        return self.ids[self.offsets[i] : self.offsets[i + 1]]
+
+    def lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def row_indices(self) -> np.ndarray:
+        """Document index of every entry of `ids`."""
+        return np.repeat(np.arange(self.n_docs), self.lengths())
+
+    def to_csr(self, n_hubs: int, dtype: Any = np.int64) -> sp.csr_matrix:
+        """Binary documents x hubs matrix (repeated hubs count once)."""
+        matrix = sp.csr_matrix(
+            (np.ones(len(self.ids), dtype=dtype), self.ids, self.offsets),
+            shape=(self.n_docs, n_hubs),
+        )
+        matrix.sum_duplicates()
+        matrix.data[:] = 1
+        return matrix
+
+    @staticmethod
+    def from_rows(rows: np.ndarray, ids: np.ndarray, n_docs: int) -> "HubCodes":
+        """Build from parallel (document, hub id) arrays sorted by document."""
+        lengths = np.bincount(rows.astype(np.int64), minlength=n_docs)
+        offsets = np.zeros(n_docs + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        return HubCodes(offsets, ids.astype(np.int32))
+
+    @staticmethod
+    def concatenate(parts: Iterable["HubCodes"]) -> "HubCodes":
+        offsets: List[np.ndarray] = [np.zeros(1, dtype=np.int64)]
+        ids: List[np.ndarray] = []
+        total = 0
+        for part in parts:
+            offsets.append(part.offsets[1:] + total)
+            ids.append(part.ids)
+            total += len(part.ids)
+        return HubCodes(
+            np.concatenate(offsets),
+            np.concatenate(ids) if ids else np.empty(0, dtype=np.int32),
+        )
+
+
+class HubVocabulary:
+    """
+    Shared hub name <-> id mapping. Ids are stable: existing hubs keep their
+    id and new hubs are appended, so a vocabulary saved next to a dataset can
+    be reused by every later stage (targets, negatives, encoders, serving).
+
+    Example usage:
+        vocabulary = HubVocabulary.load("data/processed/hubs.json")
+        codes = vocabulary.encode(df["hubs"])
+        mask = codes.to_csr(len(vocabulary))
+    """
+
+    def __init__(self, names: Iterable[str] = ()):
+        self.names: List[str] = []
+        self.ids: Dict[str, int] = {}
+        for name in names:
+            self.add(name)
+
+    @classmethod
+    def from_counts(cls, hub_counts: Dict[str, int]) -> "HubVocabulary":
+        """Hubs ordered by descending frequency, so top hubs get the smallest ids."""
+        return cls(sorted(hub_counts, key=lambda hub: (-hub_counts[hub], hub)))
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, hub: object) -> bool:
+        return hub in self.ids
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names)
+
+    def add(self, hub: str) -> int:
+        hub_id = self.ids.get(hub)
+        if hub_id is None:
+            hub_id = self.ids[hub] = len(self.names)
+            self.names.append(hub)
+        return hub_id
+
+    def id_of(self, hub: str) -> int:
+        if hub not in self.ids:
+            raise KeyError("{} not in vocabulary".format(hub))
+        return self.ids[hub]
+
+    def decode(self, ids: Iterable[int]) -> List[str]:
+        return [self.names[i] for i in ids]
+
+    def encode(
+        self, hub_lists: Union[pd.Series, Iterable[Any]], grow: bool = True
+    ) -> HubCodes:
+        """
+        Encode per-document hubs into CSR codes. A document may hold a list of
+        hub names, a single name, or an array of ids (e.g. from
+        load_dataset_from_zst(compact=True)). Unknown hubs are added when
+        `grow` is set and dropped otherwise; ids must already be in the
+        vocabulary.
+        """
+        series = (
+            hub_lists
+            if isinstance(hub_lists, pd.Series)
+            else pd.Series(list(hub_lists), dtype=object)
+        )
+        series = series.reset_index(drop=True)
+        flat = series.explode().dropna()
+
+        if pd.api.types.is_integer_dtype(flat.infer_objects().dtype):
+            ids = flat.to_numpy(dtype=np.int64)
+            invalid = (ids < 0) | (ids >= len(self))
+            if invalid.any():
+                raise ValueError(
+                    f"Hub ids {sorted(set(ids[invalid].tolist()))[:10]} are out of "
+                    f"range for a vocabulary of {len(self)} hubs"
+                )
+        else:
+            if grow:
+                for hub in pd.unique(flat.to_numpy()):
+                    self.add(hub)
+            ids = flat.map(self.ids).to_numpy(dtype=np.float64)
+            keep = ~np.isnan(ids)
+            flat, ids = flat[keep], ids[keep].astype(np.int64)
+
+        return HubCodes.from_rows(flat.index.to_numpy(), ids, len(series))
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Write the names as a JSON list; a hub's id is its position."""
+        Path(path).write_text(json.dumps(self.names, ensure_ascii=False), "utf-8")
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "HubVocabulary":
+        return cls(json.loads(Path(path).read_text("utf-8")))
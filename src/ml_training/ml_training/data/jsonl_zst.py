@@ -0,0 +1,379 @@
+import io
+import json
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from types import TracebackType
+from typing import (
+    Any,
+    Deque,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import pandas as pd
+import zstandard as zstd
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speedup
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Sidecar with frame offsets, written next to every file produced by JsonlZstWriter
+FRAMES_SUFFIX = ".frames.json"
+# Manifest of a sharded dataset directory
+MANIFEST_NAME = "manifest.json"
+DEFAULT_FRAME_ROWS = 10_000
+
+
+class ReadUnit(NamedTuple):
+    """Independently decompressible byte range of a jsonl.zst file."""
+
+    path: Path
+    offset: int
+    length: int  # -1 = until the end of the file
+
+
+def _json_default(obj: Any) -> Any:
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def json_loads(line: bytes) -> Any:
+    """Decode one JSON line, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(line)
+    return json.loads(line)
+
+
+def json_dumps(obj: Any) -> bytes:
+    """Encode an object as one JSON line (without the newline)."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, ensure_ascii=False, default=_json_default).encode("utf-8")
+
+
+def _frame_table_error(table: Any, file_size: int) -> Optional[str]:
+    try:
+        end = 0
+        rows = 0
+        for offset, length, frame_rows in table["frames"]:
+            if offset != end or length <= 0 or frame_rows < 0:
+                return f"frame at offset {offset} does not follow offset {end}"
+            end += length
+            rows += frame_rows
+        if rows != table["rows"]:
+            return f"frames hold {rows} rows, table says {table['rows']}"
+    except (KeyError, TypeError, ValueError):
+        return "malformed frame table"
+    if end != file_size:
+        return f"frames end at byte {end}, file has {file_size} bytes"
+    return None
+
+
+def read_frame_table(path: Path) -> Optional[dict[str, Any]]:
+    """
+    Frame offsets of a file written by JsonlZstWriter, None if unknown. A
+    sidecar that does not match the file (e.g. left over from an interrupted
+    write) is ignored with a warning.
+    """
+    frames_path = Path(f"{path}{FRAMES_SUFFIX}")
+    if not frames_path.exists():
+        return None
+    with open(frames_path, "rb") as f:
+        table = json_loads(f.read())
+    error = _frame_table_error(table, Path(path).stat().st_size)
+    if error is not None:
+        logger.warning("Ignoring frame table of %s: %s", path, error)
+        return None
+    return table  # type: ignore[no-any-return]
+
+
+def list_shards(path: Path) -> List[Path]:
+    """Files of a dataset: the shards of a manifest directory or the file itself."""
+    path = Path(path)
+    if not path.is_dir():
+        return [path]
+    with open(path / MANIFEST_NAME, "rb") as f:
+        manifest = json_loads(f.read())
+    return [path / shard["path"] for shard in manifest["shards"]]
+
+
+def list_read_units(path: Path) -> List[ReadUnit]:
+    """
+    Split a dataset into independently decompressible units, in reading order:
+    one unit per zstd frame when the frame table is known, else one per file.
+    """
+    units = []
+    for shard in list_shards(path):
+        frame_table = read_frame_table(shard)
+        if frame_table is None:
+            units.append(ReadUnit(shard, 0, -1))
+        else:
+            units.extend(
+                ReadUnit(shard, offset, length)
+                for offset, length, _ in frame_table["frames"]
+            )
+    return units
+
+
+def iter_unit_lines(unit: ReadUnit) -> Iterator[bytes]:
+    with open(unit.path, "rb") as fh:
+        source: Any = fh
+        if unit.length >= 0:
+            fh.seek(unit.offset)
+            source = io.BytesIO(fh.read(unit.length))
+
+        dctx = zstd.ZstdDecompressor()
+        with dctx.stream_reader(source, read_across_frames=True) as reader:
+            for line in io.BufferedReader(reader, buffer_size=1 << 20):
+                if line.strip():
+                    yield line
+
+
+def iter_jsonl_zst_lines(path: Path) -> Iterator[bytes]:
+    """
+    Iterate over raw (undecoded) lines of a jsonl.zst file or sharded directory.
+    Lines are yielded as bytes, so no text decoding happens before JSON parsing.
+    """
+    for shard in list_shards(path):
+        yield from iter_unit_lines(ReadUnit(shard, 0, -1))
+
+
+class JsonlZstWriter:
+    """
+    Writes JSON lines into a zstd file as independent frames of `frame_rows`
+    lines and stores the frame offsets in a `.frames.json` sidecar, so that
+    the file can later be decompressed in parallel.
+
+    With `threads` > 1, frames are compressed on a thread pool while the
+    producer keeps serialising the next ones; frames are still written in
+    order. With `append=True`, frames are added to an existing file written
+    by this class.
+
+    Example usage:
+        with JsonlZstWriter("data/raw/train.jsonl.zst") as writer:
+            writer.write({"id": 1, "text": "..."})
+            writer.write_columns({"id": [2, 3], "text": ["...", "..."]})
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        frame_rows: int = DEFAULT_FRAME_ROWS,
+        level: int = 3,
+        threads: int = 0,
+        append: bool = False,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.frame_rows = frame_rows
+        self.level = level
+        self.rows = 0
+        self.frames: List[List[int]] = []
+        self._buffer: List[bytes] = []
+        self._local = threading.local()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Deque[Tuple["Future[bytes]", int]] = deque()
+        self._max_pending = 2 * threads
+
+        if append and self.path.exists():
+            # The table is validated against the file size, so appending never
+            # overwrites data the sidecar does not know about
+            table = read_frame_table(self.path)
+            if table is None:
+                raise ValueError(
+                    f"Cannot append to {self.path}: no frame table matching the file"
+                )
+            self.rows = table["rows"]
+            self.frames = table["frames"]
+            self._fh = open(self.path, "ab")
+        else:
+            self._fh = open(self.path, "wb")
+
+        if threads > 1:
+            self._executor = ThreadPoolExecutor(max_workers=threads)
+
+    def _compress(self, data: bytes) -> bytes:
+        # ZstdCompressor is not thread-safe, keep one per thread
+        cctx = getattr(self._local, "cctx", None)
+        if cctx is None:
+            cctx = self._local.cctx = zstd.ZstdCompressor(level=self.level)
+        return cctx.compress(data)  # type: ignore[no-any-return]
+
+    def write_line(self, line: bytes) -> None:
+        """Write an already encoded JSON line (without the newline)."""
+        self._buffer.append(line)
+        if len(self._buffer) >= self.frame_rows:
+            self._flush_frame()
+
+    def write(self, record: Any) -> None:
+        self.write_line(json_dumps(record))
+
+    def write_all(self, records: Iterable[Any]) -> None:
+        for record in records:
+            self.write(record)
+
+    def write_columns(self, columns: Mapping[str, Sequence[Any]]) -> None:
+        """Write rows given as equally long column sequences."""
+        names = list(columns)
+        for values in zip(*columns.values()):
+            self.write_line(json_dumps(dict(zip(names, values))))
+
+    def write_dataframe(self, df: pd.DataFrame) -> None:
+        """
+        Write DataFrame rows chunk by chunk from its columns, without building
+        a list of record dicts for the whole frame.
+        """
+        for start in range(0, len(df), self.frame_rows):
+            chunk = df.iloc[start : start + self.frame_rows]
+            self.write_columns(
+                {
+                    name: chunk.iloc[:, i].tolist()
+                    for i, name in enumerate(chunk.columns)
+                }
+            )
+
+    def _flush_frame(self) -> None:
+        if not self._buffer:
+            return
+        data = b"\n".join(self._buffer) + b"\n"
+        rows = len(self._buffer)
+        self._buffer = []
+        if self._executor is None:
+            self._write_frame(self._compress(data), rows)
+            return
+
+        self._pending.append((self._executor.submit(self._compress, data), rows))
+        while len(self._pending) > self._max_pending:
+            self._write_pending()
+
+    def _write_pending(self) -> None:
+        future, rows = self._pending.popleft()
+        self._write_frame(future.result(), rows)
+
+    def _write_frame(self, compressed: bytes, rows: int) -> None:
+        self.frames.append([self._fh.tell(), len(compressed), rows])
+        self._fh.write(compressed)
+        self.rows += rows
+
+    def close(self) -> None:
+        try:
+            self._flush_frame()
+            while self._pending:
+                self._write_pending()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown()
+            self._fh.close()
+        with open(f"{self.path}{FRAMES_SUFFIX}", "wb") as f:
+            f.write(json_dumps({"rows": self.rows, "frames": self.frames}))
+
+    def __enter__(self) -> "JsonlZstWriter":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+
+def write_manifest(path: Path, shards: List[Path], rows: List[int]) -> None:
+    manifest = {
+        "format": "jsonl.zst",
+        "rows": sum(rows),
+        "shards": [
+            {"path": shard.name, "rows": shard_rows}
+            for shard, shard_rows in zip(shards, rows)
+        ],
+    }
+    with open(Path(path) / MANIFEST_NAME, "wb") as f:
+        f.write(json_dumps(manifest))
+
+
+def reframe_jsonl_zst(
+    source: Path, target: Path, frame_rows: int = DEFAULT_FRAME_ROWS
+) -> None:
+    """
+    Rewrite a single-stream jsonl.zst file (e.g. the downloaded dump) into
+    independent frames with a frame table, enabling parallel decompression.
+    """
+    with JsonlZstWriter(target, frame_rows=frame_rows) as writer:
+        for line in iter_jsonl_zst_lines(source):
+            writer.write_line(line.rstrip(b"\r\n"))
+
+
+class ColumnBatchBuilder:
+    """
+    Accumulates records column by column and builds a DataFrame from the
+    column lists, without an intermediate list of per-row dicts.
+
+    If `columns` is given, only these keys are kept (missing keys become None),
+    otherwise every key except `exclude_columns` is kept.
+    """
+
+    def __init__(
+        self,
+        columns: Optional[List[str]] = None,
+        exclude_columns: Iterable[str] = (),
+    ):
+        self.exclude_columns = set(exclude_columns)
+        self.columns = (
+            None
+            if columns is None
+            else [col for col in columns if col not in self.exclude_columns]
+        )
+        self.reset()
+
+    def reset(self) -> None:
+        self.data: dict[str, list[Any]] = (
+            {} if self.columns is None else {col: [] for col in self.columns}
+        )
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, obj: dict[str, Any]) -> None:
+        if self.columns is not None:
+            for col in self.columns:
+                self.data[col].append(obj.get(col))
+            self.size += 1
+            return
+
+        for key, value in obj.items():
+            if key in self.exclude_columns:
+                continue
+            column = self.data.get(key)
+            if column is None:
+                column = self.data[key] = [None] * self.size
+            column.append(value)
+        self.size += 1
+        for column in self.data.values():
+            if len(column) < self.size:
+                column.append(None)
+
+    def flush(self) -> dict[str, list[Any]]:
+        """Return accumulated columns and start a new batch."""
+        data = self.data
+        self.reset()
+        return data
+
+    def build(self) -> pd.DataFrame:
+        """Build a DataFrame from accumulated rows and start a new batch."""
+        size = self.size
+        return pd.DataFrame(self.flush(), index=pd.RangeIndex(size))
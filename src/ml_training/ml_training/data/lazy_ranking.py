@@ -33,7 +33,7 @@ class LazyRankingDatasetBase(Dataset):
                 ),
             ),
             torch.tensor(
-                self.target[text_hub_id[1]][text_hub_id[0]], dtype=torch.float32
+                self.target.csr[text_hub_id[0], text_hub_id[1]], dtype=torch.float32
             ),
         )
 
@@ -81,7 +81,6 @@ class SamplingLazyRankingDataset(LazyRankingDatasetBase):
 
     def _id_mapping(self) -> np.ndarray:
         n_docs, n_labels = self.target.binary_mask.shape
-        matrix = self.target.binary_mask.tocsr()
 
         neg_sampling_probs = None
         if self.sampling_strategy == "label_proportional":
@@ -96,7 +95,7 @@ class SamplingLazyRankingDataset(LazyRankingDatasetBase):
         results = []
         if self.sampling_strategy in ["fixed_cnt", "label_proportional"]:
             for doc_id in range(n_docs):
-                pos_labels = matrix[doc_id].indices  # all 1
+                pos_labels = self.target.labels_of(doc_id)  # all 1
                 neg_labels = np.setdiff1d(np.arange(n_labels), pos_labels)  # all 0
 
                 sampled_pos_labels = pos_labels
@@ -1,14 +1,23 @@
-import io
+import hashlib
+import json
 import logging
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Set
 
-import jsonlines
+import numpy as np
 import pandas as pd
 import requests
-import zstandard as zstd
 from tqdm import tqdm
 
+from ml_training.data.hub_vocabulary import HubCodes, HubVocabulary
+from ml_training.data.jsonl_zst import (
+    ColumnBatchBuilder,
+    iter_jsonl_zst_lines,
+    json_loads,
+)
 from ml_training.settings import settings
 
 # Configure logging
@@ -20,54 +29,308 @@ DEFAULT_TINY_PATH = settings.data_dir / "tiny/habr.csv"
 URL_FULL = "https://huggingface.co/datasets/IlyaGusev/habr/resolve/main/habr.jsonl.zst"
 
 
-def download_dataset(local_path: Path = DEFAULT_FULL_PATH, url: str = URL_FULL) -> None:
-    """Download full dataset from Hugging Face if it does not exist."""
+DOWNLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB per read
+DOWNLOAD_PIECE_SIZE = 64 << 20  # 64 MiB per range request
+DOWNLOAD_CONNECTIONS = 8
+
+
+def _probe_download(session: requests.Session, url: str) -> Dict[str, Any]:
+    """Final URL, size, ETag and range support of a download."""
+    with session.get(url, headers={"Range": "bytes=0-0"}, stream=True) as r:
+        r.raise_for_status()
+        info: Dict[str, Any] = {"url": r.url, "etag": r.headers.get("ETag")}
+        content_range = r.headers.get("Content-Range", "")
+        if r.status_code == 206 and "/" in content_range:
+            size = content_range.rsplit("/", 1)[1]
+            info["size"] = int(size) if size.isdigit() else None
+            info["ranges"] = info["size"] is not None
+        else:
+            info["size"] = int(r.headers.get("Content-Length", 0)) or None
+            info["ranges"] = False
+    return info
+
+
+def _load_download_state(state_path: Path, info: Dict[str, Any]) -> Set[int]:
+    """Pieces finished by an earlier attempt of the same download."""
+    if not state_path.exists():
+        return set()
+    try:
+        state = json.loads(state_path.read_text())
+    except ValueError:
+        return set()
+    same = all(state.get(key) == info[key] for key in ("size", "etag", "piece_size"))
+    return set(state.get("done", [])) if same else set()
+
+
+def _download_piece(
+    session: requests.Session,
+    url: str,
+    part_path: Path,
+    start: int,
+    end: int,
+    chunk_size: int,
+    pbar: tqdm,
+) -> None:
+    headers = {"Range": f"bytes={start}-{end - 1}"}
+    with session.get(url, headers=headers, stream=True) as r:
+        r.raise_for_status()
+        if r.status_code != 206:
+            raise ValueError(f"Server ignored range request for {url}")
+        with open(part_path, "r+b") as f:
+            f.seek(start)
+            for chunk in r.iter_content(chunk_size=chunk_size):
+                f.write(chunk)
+                pbar.update(len(chunk))
+            if f.tell() != end:
+                raise ValueError(f"Incomplete range {start}-{end - 1} of {url}")
+
+
+def _download_stream(
+    session: requests.Session, url: str, part_path: Path, chunk_size: int, pbar: tqdm
+) -> None:
+    with session.get(url, stream=True) as r, open(part_path, "wb") as f:
+        r.raise_for_status()
+        for chunk in r.iter_content(chunk_size=chunk_size):
+            f.write(chunk)
+            pbar.update(len(chunk))
+
+
+def _file_sha256(path: Path, chunk_size: int) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def download_dataset(
+    local_path: Path = DEFAULT_FULL_PATH,
+    url: str = URL_FULL,
+    sha256: Optional[str] = None,
+    num_connections: int = DOWNLOAD_CONNECTIONS,
+    piece_size: int = DOWNLOAD_PIECE_SIZE,
+    chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+) -> None:
+    """
+    Download full dataset from Hugging Face if it does not exist.
+
+    The file is fetched in `piece_size` ranges over `num_connections` parallel
+    connections into `<local_path>.part`. Finished pieces are recorded in
+    `<local_path>.part.json`, so an interrupted download resumes where it
+    stopped. The size (and `sha256`, when given) is verified before the file
+    is atomically renamed to `local_path`; without `sha256` a warning says that
+    the content itself was not checked.
+    """
+    local_path = Path(local_path)
     os.makedirs(os.path.dirname(local_path), exist_ok=True)
 
     if os.path.exists(local_path):
         logger.info(f"Dataset already exists at {local_path}, skipping download.")
         return
 
+    part_path = Path(f"{local_path}.part")
+    state_path = Path(f"{local_path}.part.json")
+
     logger.info(f"Downloading dataset from {url} to {local_path}")
-    with requests.get(url, stream=True) as r:
-        r.raise_for_status()
-        total_size = int(r.headers.get("content-length", 0))
-        chunk_size = 8192
-
-        with (
-            open(local_path, "wb") as f,
-            tqdm(
-                total=total_size, unit="B", unit_scale=True, desc="Downloading"
-            ) as pbar,
-        ):
-            for chunk in r.iter_content(chunk_size=chunk_size):
-                f.write(chunk)
-                pbar.update(len(chunk))
+    with requests.Session() as session:
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=num_connections)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        info = _probe_download(session, url)
+        info["piece_size"] = piece_size
+        size = info["size"]
+
+        with tqdm(total=size, unit="B", unit_scale=True, desc="Downloading") as pbar:
+            if not info["ranges"]:
+                _download_stream(session, info["url"], part_path, chunk_size, pbar)
+            else:
+                done = _load_download_state(state_path, info)
+                if not part_path.exists() or part_path.stat().st_size != size:
+                    done = set()
+                    with open(part_path, "wb") as f:
+                        f.truncate(size)
+
+                pieces = range((size + piece_size - 1) // piece_size)
+                pbar.update(sum(min(piece_size, size - i * piece_size) for i in done))
+                lock = threading.Lock()
+
+                def fetch(i: int) -> None:
+                    start = i * piece_size
+                    _download_piece(
+                        session,
+                        info["url"],
+                        part_path,
+                        start,
+                        min(start + piece_size, size),
+                        chunk_size,
+                        pbar,
+                    )
+                    with lock:
+                        done.add(i)
+                        state_path.write_text(
+                            json.dumps({**info, "done": sorted(done)})
+                        )
+
+                with ThreadPoolExecutor(max_workers=num_connections) as executor:
+                    for future in [
+                        executor.submit(fetch, i) for i in pieces if i not in done
+                    ]:
+                        future.result()
+
+    actual_size = part_path.stat().st_size
+    if size is not None and actual_size != size:
+        raise ValueError(f"Downloaded {actual_size} bytes, expected {size}")
+    if sha256 is not None:
+        actual_sha256 = _file_sha256(part_path, chunk_size)
+        if actual_sha256 != sha256.lower():
+            part_path.unlink()
+            state_path.unlink(missing_ok=True)
+            raise ValueError(
+                f"Checksum mismatch for {url}: got {actual_sha256}, expected {sha256}"
+            )
+        logger.info("Checksum verified: sha256 %s", actual_sha256)
+    else:
+        logger.warning(
+            "No sha256 given for %s: only the size (%s bytes) was verified",
+            url,
+            actual_size,
+        )
+
+    os.replace(part_path, local_path)
+    state_path.unlink(missing_ok=True)
     logger.info("Download completed!")
 
 
+# Columns downcast by load_dataset_from_zst(compact=True)
+CATEGORICAL_COLUMNS = ("language", "author")
+INT32_COLUMNS = ("id", "time_published", "reading_time")
+HUBS_COLUMN = "hubs"
+
+
+class _ColumnChunks:
+    """
+    Per-column accumulator for load_dataset_from_zst. Chunks are converted to
+    their compact form as soon as they are read, so only the compact columns
+    are held until the final DataFrame is assembled.
+    """
+
+    def __init__(self, compact: bool, vocabulary: Optional[HubVocabulary] = None):
+        self.compact = compact
+        self.size = 0
+        self.parts: Dict[str, List[Any]] = {}
+        self.categories: Dict[str, Dict[Any, int]] = {}
+        self.vocabulary = vocabulary if vocabulary is not None else HubVocabulary()
+
+    def _codes(self, values: List[Any], mapping: Dict[Any, int]) -> np.ndarray:
+        return np.fromiter(
+            (
+                -1 if value is None else mapping.setdefault(value, len(mapping))
+                for value in values
+            ),
+            dtype=np.int32,
+            count=len(values),
+        )
+
+    def _convert(self, name: str, values: List[Any]) -> Any:
+        if not self.compact:
+            return values
+        if name in CATEGORICAL_COLUMNS:
+            return self._codes(values, self.categories.setdefault(name, {}))
+        if name in INT32_COLUMNS:
+            try:
+                return np.array(values, dtype=np.int32)
+            except (TypeError, ValueError, OverflowError):
+                return pd.array(values, dtype="Int64")
+        if name == HUBS_COLUMN:
+            return self.vocabulary.encode(values)
+        return values
+
+    def add(self, data: Dict[str, List[Any]], size: int) -> None:
+        # Columns absent from a chunk are filled with missing values
+        for name in self.parts.keys() - data.keys():
+            self.parts[name].append(self._convert(name, [None] * size))
+        for name, values in data.items():
+            if name not in self.parts:
+                self.parts[name] = (
+                    [self._convert(name, [None] * self.size)] if self.size else []
+                )
+            self.parts[name].append(self._convert(name, values))
+        self.size += size
+
+    def _column(self, name: str) -> Any:
+        chunks = self.parts[name]
+        if not self.compact or name not in (
+            CATEGORICAL_COLUMNS + INT32_COLUMNS + (HUBS_COLUMN,)
+        ):
+            return [value for chunk in chunks for value in chunk]
+        if name in CATEGORICAL_COLUMNS:
+            return pd.Categorical.from_codes(
+                np.concatenate(chunks), categories=list(self.categories[name])
+            )
+        if name in INT32_COLUMNS:
+            return pd.concat([pd.Series(chunk) for chunk in chunks], ignore_index=True)
+
+        codes = HubCodes.concatenate(chunks)
+        # Row arrays are views into one flat array of hub ids
+        hubs = np.empty(codes.n_docs, dtype=object)
+        for i in range(codes.n_docs):
+            hubs[i] = codes.row(i)
+        return hubs
+
+    def build(self) -> pd.DataFrame:
+        df = pd.DataFrame(
+            {name: self._column(name) for name in self.parts},
+            index=pd.RangeIndex(self.size),
+        )
+        if self.compact and HUBS_COLUMN in self.parts:
+            df.attrs["hub_vocabulary"] = self.vocabulary
+        return df
+
+
 def load_dataset_from_zst(
-    local_path: Path = DEFAULT_FULL_PATH, rows_num: int | None = None
+    local_path: Path = DEFAULT_FULL_PATH,
+    rows_num: int | None = None,
+    columns: Optional[List[str]] = None,
+    exclude_columns: Sequence[str] = (),
+    compact: bool = False,
+    chunk_rows: int = 50_000,
+    hub_vocabulary: Optional[HubVocabulary] = None,
 ) -> pd.DataFrame:
-    """Load dataset from disk into a pandas DataFrame."""
+    """
+    Load dataset from disk into a pandas DataFrame.
+
+    Only `columns` (or every column except `exclude_columns`) are kept. With
+    `compact=True`, `language` and `author` become categoricals, `id` and the
+    date columns int32, and `hubs` int32 ids of `hub_vocabulary` (a new
+    HubVocabulary if not given, extended with unseen hubs), which is stored in
+    `df.attrs["hub_vocabulary"]`. Columns are converted every `chunk_rows`
+    records, so peak memory stays close to the size of the result.
+    """
     if not os.path.exists(local_path):
         raise FileNotFoundError(
             f"{local_path} not found. Run download_dataset() first."
         )
 
     logger.info(f"Loading dataset from {local_path}")
-    data = []
-    with open(local_path, "rb") as fh:
-        dctx = zstd.ZstdDecompressor()
-        with dctx.stream_reader(fh) as reader:
-            text_reader = io.TextIOWrapper(reader, encoding="utf-8")
-            for obj in tqdm(jsonlines.Reader(text_reader), desc="Reading records"):
-                data.append(obj)
-                if rows_num is not None and len(data) >= rows_num:
-                    break
-
-    logger.info(f"Loaded {len(data)} records")
-    return pd.DataFrame(data)
+    builder = ColumnBatchBuilder(columns, exclude_columns)
+    chunks = _ColumnChunks(compact, hub_vocabulary)
+    rows = 0
+    for line in tqdm(iter_jsonl_zst_lines(Path(local_path)), desc="Reading records"):
+        if rows_num is not None and rows >= rows_num:
+            break
+        if not line.strip():
+            continue
+        builder.append(json_loads(line))
+        rows += 1
+        if len(builder) >= chunk_rows:
+            size = len(builder)
+            chunks.add(builder.flush(), size)
+    size = len(builder)
+    chunks.add(builder.flush(), size)
+
+    logger.info(f"Loaded {rows} records")
+    return chunks.build()
 
 
 def load_tiny_dataset(local_path: Path = DEFAULT_TINY_PATH) -> pd.DataFrame:
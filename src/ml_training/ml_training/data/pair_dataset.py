@@ -0,0 +1,184 @@
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Dict, Iterator, List, Optional, Type, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from ml_training.data.arrow_cache import ArrowCacheWriter
+from ml_training.data.habr_dataset import HabrDataset
+from ml_training.data.hub_vocabulary import HubVocabulary
+from ml_training.data.jsonl_zst import (
+    DEFAULT_FRAME_ROWS,
+    FRAMES_SUFFIX,
+    JsonlZstWriter,
+)
+
+ARTICLES_NAME = "articles.jsonl.zst"
+PAIRS_NAME = "pairs.arrow"
+HUBS_NAME = "hubs.json"
+
+
+class PairDatasetWriter:
+    """
+    Writes a normalized pair dataset directory:
+
+        articles.jsonl.zst  every article once, in write order
+        pairs.arrow         int columns (article_idx, hub_id, label)
+        hubs.json           HubVocabulary of the hub ids
+
+    Pairs of a batch reference rows of the same batch; they are shifted by the
+    number of articles written so far, so article_idx stays sorted as long as
+    every batch's rows are sorted.
+
+    pairs.arrow appears only when the writer is closed, so a directory without
+    it is incomplete. An aborted writer removes everything it wrote.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        vocabulary: HubVocabulary,
+        frame_rows: int = DEFAULT_FRAME_ROWS,
+    ):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        # The pair table of a previous run would point into the rewritten articles
+        (self.path / PAIRS_NAME).unlink(missing_ok=True)
+        vocabulary.save(self.path / HUBS_NAME)
+        self.num_articles = 0
+        self.num_pairs = 0
+        self._articles = JsonlZstWriter(self.path / ARTICLES_NAME, frame_rows)
+        self._pairs = ArrowCacheWriter(self.path / PAIRS_NAME)
+
+    def write_batch(
+        self,
+        articles: pd.DataFrame,
+        rows: np.ndarray,
+        hub_ids: np.ndarray,
+        labels: np.ndarray,
+    ) -> None:
+        self._articles.write_dataframe(articles)
+        self._pairs.write(
+            {
+                "article_idx": (np.asarray(rows) + self.num_articles).astype(np.int32),
+                "hub_id": np.asarray(hub_ids, dtype=np.int32),
+                "label": np.asarray(labels, dtype=np.int8),
+            },
+            len(rows),
+        )
+        self.num_articles += len(articles)
+        self.num_pairs += len(rows)
+
+    def close(self) -> None:
+        self._articles.close()
+        self._pairs.close()
+
+    def abort(self) -> None:
+        self._pairs.abort()
+        try:
+            self._articles.close()
+        finally:
+            articles_path = self.path / ARTICLES_NAME
+            for file in [
+                articles_path,
+                Path(f"{articles_path}{FRAMES_SUFFIX}"),
+                self.path / HUBS_NAME,
+            ]:
+                file.unlink(missing_ok=True)
+            if not any(self.path.iterdir()):
+                self.path.rmdir()
+
+    def __enter__(self) -> "PairDatasetWriter":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class PairDataset:
+    """
+    Lazy loader for a pair dataset written by PairDatasetWriter.
+
+    Iteration yields DataFrames with the selected article columns plus `hub`
+    and `label`, one row per pair. Articles are streamed batch by batch and
+    joined with the matching slice of the (sorted) pair table, so article text
+    is held once per batch rather than once per pair.
+
+    Example usage:
+        dataset = PairDataset("data/raw/train_pairs", columns=["text"])
+        for batch_df in dataset:
+            model.partial_fit(batch_df["text"], batch_df["hub"], batch_df["label"])
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        columns: Optional[List[str]] = None,
+        batch_size: int = 50_000,
+    ):
+        """
+        :param path: Pair dataset directory
+        :param columns: Article columns to join (None = all)
+        :param batch_size: Number of articles per batch
+        """
+        self.path = Path(path)
+        if not (self.path / PAIRS_NAME).exists():
+            raise FileNotFoundError(f"Pair dataset not found: {self.path}")
+
+        self.articles = HabrDataset(
+            self.path / ARTICLES_NAME, columns=columns, batch_size=batch_size
+        )
+        self.vocabulary = HubVocabulary.load(self.path / HUBS_NAME)
+        self.hubs = np.array(self.vocabulary.names, dtype=object)
+        with pa.memory_map(str(self.path / PAIRS_NAME), "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+            self.article_idx = self._column(table, "article_idx", np.int32)
+            self.hub_id = self._column(table, "hub_id", np.int32)
+            self.label = self._column(table, "label", np.int8)
+
+    @staticmethod
+    def _column(table: pa.Table, name: str, dtype: Any) -> np.ndarray:
+        if name not in table.column_names:
+            return np.empty(0, dtype=dtype)
+        return table.column(name).to_numpy().astype(dtype, copy=False)
+
+    def __len__(self) -> int:
+        return len(self.article_idx)
+
+    def __iter__(self) -> Iterator[pd.DataFrame]:
+        start = 0
+        for batch_df in self.articles:
+            end = start + len(batch_df)
+            lo, hi = np.searchsorted(self.article_idx, [start, end])
+            start = end
+            if lo == hi:
+                continue
+
+            local = self.article_idx[lo:hi] - (end - len(batch_df))
+            pairs_df = batch_df.iloc[local].reset_index(drop=True)
+            pairs_df["hub"] = self.hubs[self.hub_id[lo:hi]]
+            pairs_df["label"] = self.label[lo:hi]
+            yield pairs_df
+
+    def __getitem__(self, position: int) -> Dict[str, Any]:
+        """Pair at the given position, joined with its article."""
+        record = dict(self.articles[int(self.article_idx[position])])
+        record["hub"] = self.hubs[self.hub_id[position]]
+        record["label"] = int(self.label[position])
+        return record
+
+    def get_dataframe(self) -> pd.DataFrame:
+        batches = list(self)
+        if not batches:
+            return pd.DataFrame(columns=["hub", "label"])
+        return pd.concat(batches, ignore_index=True)
@@ -0,0 +1,209 @@
+import hashlib
+import io
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Iterator, List, Optional
+
+import numpy as np
+import zstandard as zstd
+from tqdm import tqdm
+
+from ml_training.data.jsonl_zst import (
+    MANIFEST_NAME,
+    ReadUnit,
+    json_loads,
+    list_read_units,
+    list_shards,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def index_file_path(path: Path, index_dir: Optional[Path] = None) -> Path:
+    """
+    Sidecar location: next to the data by default, or in `index_dir` under a
+    name keyed by the resolved source path.
+    """
+    path = Path(path)
+    if index_dir is not None:
+        key = hashlib.sha1(str(path.resolve()).encode("utf-8")).hexdigest()[:16]
+        return Path(index_dir) / f"{path.name}.{key}.index.npz"
+    if path.is_dir():
+        return path / "index.npz"
+    return Path(f"{path}.index.npz")
+
+
+def _fingerprint(path: Path) -> str:
+    files = list_shards(path)
+    if Path(path).is_dir():
+        files.append(Path(path) / MANIFEST_NAME)
+    parts = []
+    for file in files:
+        stat = file.stat()
+        parts.append(f"{file.name}|{stat.st_size}|{stat.st_mtime_ns}")
+    return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+def _iter_raw_lines(unit: ReadUnit) -> Iterator[bytes]:
+    """All lines of a unit, blank ones included, streamed from disk."""
+    with open(unit.path, "rb") as fh:
+        source: Any = fh
+        if unit.length >= 0:
+            fh.seek(unit.offset)
+            source = io.BytesIO(fh.read(unit.length))
+        dctx = zstd.ZstdDecompressor()
+        with dctx.stream_reader(source, read_across_frames=True) as reader:
+            yield from io.BufferedReader(reader, buffer_size=1 << 20)
+
+
+def _read_frame_bytes(unit: ReadUnit) -> bytes:
+    if unit.length < 0:
+        raise ValueError(
+            f"Random access to {unit.path} needs a frame table: "
+            "rewrite the file with reframe_jsonl_zst first"
+        )
+    with open(unit.path, "rb") as fh:
+        fh.seek(unit.offset)
+        compressed = fh.read(unit.length)
+    dctx = zstd.ZstdDecompressor()
+    with dctx.stream_reader(io.BytesIO(compressed)) as reader:
+        return reader.read()  # type: ignore[no-any-return]
+
+
+class RecordIndex:
+    """
+    Sidecar index of a jsonl.zst dataset: for every record, the read unit
+    (zstd frame or file) it lives in, its byte offset and length inside the
+    decompressed unit and its article id.
+
+    Random access decompresses only the frame holding the record. It is only
+    supported for framed files (see save_jsonl_zst and reframe_jsonl_zst):
+    a single-stream file would have to be decompressed in full.
+    """
+
+    def __init__(
+        self,
+        units: List[ReadUnit],
+        unit_ids: np.ndarray,
+        offsets: np.ndarray,
+        lengths: np.ndarray,
+        ids: np.ndarray,
+    ):
+        self.units = units
+        self.unit_ids = unit_ids
+        self.offsets = offsets
+        self.lengths = lengths
+        self.ids = ids
+        self._ids_order: Optional[np.ndarray] = None
+        self._sorted_ids: Optional[np.ndarray] = None
+        self._cached_unit_id = -1
+        self._cached_unit_bytes = b""
+
+    @classmethod
+    def build(cls, path: Path) -> "RecordIndex":
+        units = list_read_units(path)
+        unit_ids: List[int] = []
+        offsets: List[int] = []
+        lengths: List[int] = []
+        ids: List[int] = []
+
+        for unit_id, unit in enumerate(tqdm(units, desc="Building index")):
+            position = 0
+            for line in _iter_raw_lines(unit):
+                if line.strip():
+                    unit_ids.append(unit_id)
+                    offsets.append(position)
+                    lengths.append(len(line))
+                    record_id = json_loads(line).get("id")
+                    ids.append(-1 if record_id is None else int(record_id))
+                position += len(line)
+
+        return cls(
+            units,
+            np.array(unit_ids, dtype=np.int32),
+            np.array(offsets, dtype=np.int64),
+            np.array(lengths, dtype=np.int64),
+            np.array(ids, dtype=np.int64),
+        )
+
+    def save(self, path: Path, index_dir: Optional[Path] = None) -> None:
+        index_path = index_file_path(path, index_dir)
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        # Written next to the target and renamed, so readers never see a partial file
+        fd, tmp_name = tempfile.mkstemp(dir=index_path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(
+                    f,
+                    fingerprint=np.array(_fingerprint(path)),
+                    unit_ids=self.unit_ids,
+                    offsets=self.offsets,
+                    lengths=self.lengths,
+                    ids=self.ids,
+                )
+            os.replace(tmp_name, index_path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+    @classmethod
+    def load(
+        cls, path: Path, index_dir: Optional[Path] = None
+    ) -> Optional["RecordIndex"]:
+        """Load the sidecar index, None if it is missing or outdated."""
+        index_path = index_file_path(path, index_dir)
+        if not index_path.exists():
+            return None
+        with np.load(index_path) as data:
+            if str(data["fingerprint"]) != _fingerprint(path):
+                return None
+            return cls(
+                list_read_units(path),
+                data["unit_ids"],
+                data["offsets"],
+                data["lengths"],
+                data["ids"],
+            )
+
+    @classmethod
+    def load_or_build(
+        cls, path: Path, index_dir: Optional[Path] = None, save: bool = True
+    ) -> "RecordIndex":
+        """
+        Load the sidecar index or build it. A built index is saved unless `save`
+        is False; if the sidecar can't be written (e.g. a read-only directory)
+        the index is only kept in memory.
+        """
+        index = cls.load(path, index_dir)
+        if index is None:
+            index = cls.build(path)
+            if save:
+                try:
+                    index.save(path, index_dir)
+                except OSError as error:
+                    logger.warning(
+                        "Keeping the record index of %s in memory: %s", path, error
+                    )
+        return index
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def read_line(self, position: int) -> bytes:
+        unit_id = int(self.unit_ids[position])
+        if unit_id != self._cached_unit_id:
+            self._cached_unit_bytes = _read_frame_bytes(self.units[unit_id])
+            self._cached_unit_id = unit_id
+        offset = int(self.offsets[position])
+        return self._cached_unit_bytes[offset : offset + int(self.lengths[position])]
+
+    def position_of(self, article_id: int) -> int:
+        if self._ids_order is None or self._sorted_ids is None:
+            self._ids_order = np.argsort(self.ids, kind="stable")
+            self._sorted_ids = self.ids[self._ids_order]
+        found = np.searchsorted(self._sorted_ids, article_id)
+        if found == len(self._sorted_ids) or self._sorted_ids[found] != article_id:
+            raise KeyError(f"Article {article_id} not found")
+        return int(self._ids_order[found])
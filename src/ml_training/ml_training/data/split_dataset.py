@@ -1,17 +1,66 @@
 import logging
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional
 
-import pandas as pd
-from sklearn.model_selection import train_test_split
+import numpy as np
 
 from ml_training.data.habr_dataset import HabrDataset
+from ml_training.data.jsonl_zst import JsonlZstWriter
 from ml_training.data.loaders import DEFAULT_FULL_PATH
 from ml_training.settings import data_settings, settings
-from ml_training.utils import save_jsonl_zst
 
 logger = logging.getLogger("split_dataset")
 
+_GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+
+
+def _hash_uniform(ids: np.ndarray, seed: int) -> np.ndarray:
+    """Seeded splitmix64 hash of integer ids mapped to uniform floats in [0, 1)."""
+    offset = np.uint64(((seed + 1) * _GOLDEN_GAMMA) % (1 << 64))
+    z = ids.astype(np.uint64) + offset
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    z = z ^ (z >> np.uint64(31))
+    return (z >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+def assign_splits(ids: np.ndarray, fractions: List[float], seed: int) -> np.ndarray:
+    """
+    Split index for every id: ids fall into split k with probability
+    fractions[k]. Depends only on the id and the seed, so the assignment is
+    reproducible and independent of record order and batching.
+    """
+    bounds = np.cumsum(fractions)[:-1]
+    return np.searchsorted(bounds, _hash_uniform(np.asarray(ids), seed), side="right")
+
+
+def stream_split(
+    dataset: HabrDataset,
+    paths: List[Path],
+    fractions: List[float],
+    random_state: int,
+    rename: Optional[Dict[str, str]] = None,
+) -> List[int]:
+    """
+    Single pass over the dataset writing every batch straight into one
+    compressed output per split. Memory use is bounded by the batch size.
+    """
+    writers = [JsonlZstWriter(path) for path in paths]
+    counts = [0] * len(paths)
+    try:
+        for batch_df in dataset:
+            if rename:
+                batch_df = batch_df.rename(columns=rename)
+            codes = assign_splits(batch_df["id"].to_numpy(), fractions, random_state)
+            for k, writer in enumerate(writers):
+                part = batch_df[codes == k]
+                writer.write_dataframe(part)
+                counts[k] += len(part)
+    finally:
+        for writer in writers:
+            writer.close()
+    return counts
+
 
 def main() -> None:
     logger.info("Starting to split dataset")
@@ -25,26 +74,15 @@ def main() -> None:
         path=raw_path, columns=columns, batch_size=data_settings.batch_size
     )
 
-    all_rows = []
-    for batch_df in dataset:
-        batch_df = batch_df.rename(columns={"text_markdown": "text"})
-        all_rows.append(batch_df)
-
-    df = pd.concat(all_rows, ignore_index=True)
-
-    logger.info("Splitting the dataset into train/test")
-    train_df, test_df = train_test_split(
-        df,
-        test_size=data_settings.test_size,
-        random_state=data_settings.random_seed,
-        shuffle=True,
+    logger.info("Splitting the dataset into %s and %s", train_path, test_path)
+    train_rows, test_rows = stream_split(
+        dataset,
+        [train_path, test_path],
+        [1 - data_settings.test_size, data_settings.test_size],
+        data_settings.random_seed,
+        rename={"text_markdown": "text"},
     )
-
-    logger.info("Saving train dataset to %s", train_path)
-    save_jsonl_zst(train_df, train_path)
-
-    logger.info("Saving test dataset to %s", test_path)
-    save_jsonl_zst(test_df, test_path)
+    logger.info("Train rows: %d, test rows: %d", train_rows, test_rows)
 
     logger.info("Done")
 
@@ -60,26 +98,15 @@ def split_dataset(
     reader_batch_size: int = data_settings.batch_size,
     random_state: int = data_settings.random_seed,
 ) -> None:
-    df = HabrDataset(
+    dataset = HabrDataset(
         path=input_path, columns=columns, batch_size=reader_batch_size
-    ).get_dataframe()
-
-    train_df, test_val_df = train_test_split(
-        df, test_size=test_size + val_size, random_state=random_state, shuffle=True
     )
-    val_df, test_df = train_test_split(
-        test_val_df,
-        test_size=test_size / (test_size + val_size),
-        random_state=random_state,
-        shuffle=True,
+    paths = [train_path, val_path, test_path]
+    counts = stream_split(
+        dataset, paths, [1 - val_size - test_size, val_size, test_size], random_state
     )
-    for dataset, path in [
-        (train_df, train_path),
-        (val_df, val_path),
-        (test_df, test_path),
-    ]:
-        logger.info("Saving to {}".format(path))
-        save_jsonl_zst(dataset, path)
+    for path, rows in zip(paths, counts):
+        logger.info("Saved {} rows to {}".format(rows, path))
 
 
 if __name__ == "__main__":
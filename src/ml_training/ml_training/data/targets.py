@@ -1,37 +1,299 @@
-from collections import abc
-from typing import Literal
+import json
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+from pathlib import Path
+from typing import Literal, Sequence
 
 import numpy as np
 import pandas as pd
 import scipy.sparse as sp
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.preprocessing import MultiLabelBinarizer
+
+from ml_training.data.hub_vocabulary import HubCodes, HubVocabulary
+from ml_training.settings import settings
 
 Index = str | int | list[str] | list[int] | None
 
+TARGET_META_NAME = "target.json"
+DEFAULT_CLUSTERS_PATH = settings.data_dir / "targets" / "clusters.json"
+MissingLabels = Literal["drop", "own", "other"]
+
+
+def load_clusters(path: Path | str = DEFAULT_CLUSTERS_PATH) -> dict[str, list[str]]:
+    """Кластеры хабов в формате {cluster: [hub, ...]}, как в clusters.json."""
+    with open(path, encoding="utf-8") as f:
+        clusters: dict[str, list[str]] = json.load(f)
+    return clusters
+
+
+class PackedBinaryMask:
+    """
+    Плотная бинарная матрица документы x лейблы, упакованная по 8 лейблов в
+    байт: лейбл j документа i хранится в бите j % 8 байта bits[i, j // 8].
+    Поддерживает срезы вида mask[:, idx], mask[i] и sum через popcount.
+    """
+
+    ndim = 2
+    dtype = np.dtype(bool)
+
+    def __init__(self, bits: np.ndarray, shape: tuple[int, int]):
+        self.bits = bits
+        self.shape = shape
+
+    @classmethod
+    def from_codes(cls, codes: HubCodes, n_labels: int) -> "PackedBinaryMask":
+        bits = np.zeros((codes.n_docs, (n_labels + 7) // 8), dtype=np.uint8)
+        ids = codes.ids.astype(np.int64)
+        np.bitwise_or.at(
+            bits, (codes.row_indices(), ids >> 3), (1 << (ids & 7)).astype(np.uint8)
+        )
+        return cls(bits, (codes.n_docs, n_labels))
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.bits.nbytes)
+
+    def column(self, idx: int | np.ndarray) -> np.ndarray:
+        idx = np.asarray(idx)
+        shifts = (idx & 7).astype(np.uint8)
+        return ((self.bits[:, idx >> 3] >> shifts) & 1).astype(bool)
+
+    def row(self, doc_id: int) -> np.ndarray:
+        return np.unpackbits(
+            self.bits[doc_id], count=self.shape[1], bitorder="little"
+        ).astype(bool)
+
+    def toarray(self) -> np.ndarray:
+        return np.unpackbits(
+            self.bits, axis=1, count=self.shape[1], bitorder="little"
+        ).astype(bool)
+
+    def __array__(self, dtype: np.dtype | None = None, copy: bool | None = None):
+        array = self.toarray()
+        return array if dtype is None else array.astype(dtype)
+
+    def __getitem__(self, key: object) -> np.ndarray:
+        if isinstance(key, (int, np.integer)):
+            return self.row(int(key))
+        if (
+            isinstance(key, tuple)
+            and len(key) == 2
+            and isinstance(key[0], slice)
+            and key[0] == slice(None)
+        ):
+            return self.column(key[1])  # type: ignore[arg-type]
+        return self.toarray()[key]
+
+    def sum(self, axis: int | None = None) -> np.ndarray | int:
+        if axis is None:
+            return int(np.bitwise_count(self.bits).sum(dtype=np.int64))
+        if axis == 1:
+            return np.bitwise_count(self.bits).sum(axis=1, dtype=np.int64)
+        # По одному проходу на позицию бита: лейблы bit, bit + 8, ...
+        counts = np.zeros(self.bits.shape[1] * 8, dtype=np.int64)
+        for bit in range(8):
+            counts[bit::8] = ((self.bits >> bit) & 1).sum(axis=0, dtype=np.int64)
+        return counts[: self.shape[1]]
+
+    def to_csr(self, chunk_rows: int = 65536) -> sp.csr_matrix:
+        chunks = [
+            sp.csr_matrix(
+                np.unpackbits(
+                    self.bits[start : start + chunk_rows],
+                    axis=1,
+                    count=self.shape[1],
+                    bitorder="little",
+                ).astype(bool)
+            )
+            for start in range(0, self.shape[0], chunk_rows)
+        ]
+        if not chunks:
+            return sp.csr_matrix(self.shape, dtype=bool)
+        return sp.vstack(chunks, format="csr")
+
 
 class Target:
-    dataset: pd.DataFrame
-    targets: pd.Series
+    dataset: pd.DataFrame | None
     column_name: str
     labels: list[str]
-    binary_mask: np.ndarray | sp.spmatrix
+    binary_mask: np.ndarray | sp.spmatrix | PackedBinaryMask
     sparse: bool
+    # Для Target, полученного через project: исходный Target и матрица
+    # назначения лейблов исходного Target кластерам (n_labels x n_clusters)
+    parent: "Target | None" = None
+    assignment: sp.csr_matrix | None = None
 
-    def __init__(self, dataset: pd.DataFrame, column_name: str, sparse: bool = False):
+    def __init__(
+        self,
+        dataset: pd.DataFrame,
+        column_name: str,
+        sparse: bool = False,
+        vocabulary: HubVocabulary | None = None,
+        packed: bool = False,
+    ):
+        """
+        С `vocabulary` id лейблов совпадают с id словаря (новые лейблы в него
+        добавляются), а колонка может содержать и массивы id, как после
+        load_dataset_from_zst(compact=True). Без словаря лейблы сортируются.
+
+        При sparse=False маска — плотный bool-массив, а при packed=True —
+        PackedBinaryMask (1 бит на ячейку).
+        """
         self.dataset = dataset
         self.column_name = column_name
-        self.targets = Target._as_str_list(dataset[column_name])
-        self.labels = Target._get_labels(self.targets)
         self.sparse = sparse
-        self.binary_mask = MultiLabelBinarizer(
-            classes=self.labels,
-            sparse_output=sparse,
-        ).fit_transform(self.targets)
-        if sp.issparse(self.binary_mask):
-            self.binary_mask = self.binary_mask.tocsc()
+        if vocabulary is not None:
+            codes = vocabulary.encode(dataset[column_name])
+            self.labels = list(vocabulary.names)
+        else:
+            self.labels, codes = Target._factorize(dataset[column_name])
+        if sparse:
+            mask = codes.to_csr(len(self.labels))
+            self.binary_mask = mask.tocsc()
+            # Строковый формат уже построен, кэшируем его для csr
+            self.__dict__["csr"] = mask
+        elif packed:
+            self.binary_mask = PackedBinaryMask.from_codes(codes, len(self.labels))
+        else:
+            self.binary_mask = np.zeros((codes.n_docs, len(self.labels)), dtype=bool)
+            self.binary_mask[codes.row_indices(), codes.ids] = True
         self.labels_to_ids = Target._label_to_id(self.labels)
 
+    @cached_property
+    def targets(self) -> pd.Series:
+        if self.parent is not None:
+            # Лейблы проекции берутся из маски, а не из колонки датасета
+            labels = np.array(self.labels, dtype=object)
+            return pd.Series(
+                [list(labels[self.labels_of(i)]) for i in range(self.n_docs)]
+            )
+        return Target._as_str_list(self._require_dataset()[self.column_name])
+
+    def _require_dataset(self) -> pd.DataFrame:
+        if self.dataset is None:
+            raise ValueError("Target was loaded without its dataset")
+        return self.dataset
+
+    def save(self, path: Path | str) -> None:
+        """
+        Сохраняет лейблы и маску в директорию: target.json (лейблы, формат,
+        размер) и .npy-массивы маски (indptr/indices/data, mask или bits).
+        Датасет не сохраняется.
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        mask = self.binary_mask
+        if isinstance(mask, PackedBinaryMask):
+            layout, arrays = "packed", {"bits": mask.bits}
+        elif sp.issparse(mask):
+            mask = self.csc
+            layout = "csc"
+            arrays = {"indptr": mask.indptr, "indices": mask.indices, "data": mask.data}
+        else:
+            layout, arrays = "dense", {"mask": mask}
+
+        for name, array in arrays.items():
+            np.save(path / f"{name}.npy", np.ascontiguousarray(array))
+        meta = {
+            "column_name": self.column_name,
+            "layout": layout,
+            "shape": list(mask.shape),
+            "labels": self.labels,
+        }
+        (path / TARGET_META_NAME).write_text(
+            json.dumps(meta, ensure_ascii=False), encoding="utf-8"
+        )
+
+    @classmethod
+    def load(cls, path: Path | str, mmap: bool = True) -> "Target":
+        """
+        Загружает Target, сохранённый через save. Массивы маски открываются
+        через memory map (mmap=True), исходный датасет не нужен.
+        """
+        path = Path(path)
+        meta = json.loads((path / TARGET_META_NAME).read_text(encoding="utf-8"))
+        mmap_mode: Literal["r"] | None = "r" if mmap else None
+
+        def array(name: str) -> np.ndarray:
+            return np.load(path / f"{name}.npy", mmap_mode=mmap_mode)
+
+        shape = tuple(meta["shape"])
+        target = cls.__new__(cls)
+        target.dataset = None
+        target.column_name = meta["column_name"]
+        target.labels = meta["labels"]
+        target.labels_to_ids = Target._label_to_id(target.labels)
+        target.sparse = meta["layout"] == "csc"
+        if meta["layout"] == "csc":
+            target.binary_mask = sp.csc_matrix(
+                (array("data"), array("indices"), array("indptr")),
+                shape=shape,
+                copy=False,
+            )
+        elif meta["layout"] == "packed":
+            target.binary_mask = PackedBinaryMask(array("bits"), shape)
+        else:
+            target.binary_mask = array("mask")
+        return target
+
+    # Производные представления binary_mask строятся один раз и кэшируются,
+    # поэтому binary_mask не следует изменять после создания Target.
+
+    @cached_property
+    def csr(self) -> sp.csr_matrix:
+        """Маска в формате CSR: быстрый доступ к лейблам документа."""
+        if isinstance(self.binary_mask, PackedBinaryMask):
+            return self.binary_mask.to_csr()
+        return sp.csr_matrix(self.binary_mask)
+
+    @cached_property
+    def csc(self) -> sp.csc_matrix:
+        """Маска в формате CSC: быстрый доступ к документам лейбла."""
+        if sp.issparse(self.binary_mask) and self.binary_mask.format == "csc":
+            return self.binary_mask
+        return self.csr.tocsc()
+
+    @cached_property
+    def label_sizes(self) -> np.ndarray:
+        """Количество документов для каждого лейбла."""
+        if sp.issparse(self.binary_mask):
+            return np.diff(self.csc.indptr)
+        return np.asarray(self.binary_mask.sum(axis=0), dtype=np.int64)
+
+    @cached_property
+    def doc_label_counts(self) -> np.ndarray:
+        """Количество лейблов у каждого документа."""
+        if sp.issparse(self.binary_mask):
+            return np.diff(self.csr.indptr)
+        return np.asarray(self.binary_mask.sum(axis=1), dtype=np.int64)
+
+    @property
+    def n_docs(self) -> int:
+        return int(self.binary_mask.shape[0])
+
+    def labels_of(self, doc_id: int) -> np.ndarray:
+        """Идентификаторы лейблов документа."""
+        csr = self.csr
+        return csr.indices[csr.indptr[doc_id] : csr.indptr[doc_id + 1]]
+
+    def _label_ids(self, idx: Index) -> np.ndarray | int:
+        if isinstance(idx, str):
+            return self.label_to_id(idx)
+        if isinstance(idx, (int, np.integer)):
+            return int(idx)
+        return np.array(
+            [self.label_to_id(x) if isinstance(x, str) else x for x in idx],
+            dtype=np.int64,
+        )
+
+    @staticmethod
+    def _factorize(column: pd.Series) -> tuple[list[str], HubCodes]:
+        """Отсортированные лейблы и id лейблов каждой строки за один factorize."""
+        flat = column.reset_index(drop=True).explode().dropna()
+        ids, uniques = pd.factorize(flat, sort=True)
+        codes = HubCodes.from_rows(flat.index.to_numpy(), ids, len(column))
+        return list(uniques), codes
+
     @staticmethod
     def _get_labels(targets: pd.Series) -> list[str]:
         labels = set()
@@ -44,23 +306,6 @@ class Target:
     def _as_str_list(targets: pd.Series) -> pd.Series:
         return targets.apply(lambda x: [x] if isinstance(x, str) else x)
 
-    @staticmethod
-    def _transform_sparce(
-        matrix: sp.spmatrix,
-        sparce_format: Literal["csc", "csr"] = "csr",
-        format_limit: int = 1000,
-    ) -> sp.spmatrix:
-        if matrix.format == sparce_format:
-            return matrix
-        if matrix.shape[1] <= format_limit:
-            return matrix
-        if sparce_format == "csr":
-            return matrix.tocsr()
-        if sparce_format == "csc":
-            return matrix.tocsc()
-        raise ValueError(f"Format {sparce_format} not supported. Use 'csc' or 'csr'")
-        return matrix
-
     @staticmethod
     def _label_to_id(labels: list[str]) -> dict[str, int]:
         result = {}
@@ -78,23 +323,17 @@ class Target:
 
     def __getitem__(self, idx: Index) -> np.ndarray | sp.spmatrix:
         """Возвращает подмножество binary_mask по индексу."""
-        if isinstance(idx, str):
-            idx = self.label_to_id(idx)
-        elif isinstance(idx, abc.Iterable) and not isinstance(idx, np.ndarray):
-            idx = np.array(
-                list(
-                    map(lambda x: self.label_to_id(x) if isinstance(x, str) else x, idx)
-                )
-            )
+        if not isinstance(idx, np.ndarray):
+            idx = self._label_ids(idx)
 
         if sp.issparse(self.binary_mask):
-            assert self.binary_mask.format == "csc"
-            result = self.binary_mask[:, idx]
+            result = self.csc[:, idx]
             if isinstance(idx, (int, np.integer)):
                 return result.toarray().ravel()
             return result
         else:
-            return self.binary_mask[:, idx]
+            # Хранится bool/битовая маска, наружу отдаём int64 как и раньше
+            return self.binary_mask[:, idx].astype(np.int64)
 
     def get_coverage(
         self,
@@ -102,27 +341,22 @@ class Target:
         sparce_format: Literal["csc", "csr"] = "csc",
         format_limit: int = 1000,
     ) -> np.ndarray | float:
-        """Вычисляет покрытие (долю документов с хотя бы одним из указанных лейблов)."""
-        binary_submask = None
+        """
+        Вычисляет покрытие (долю документов с хотя бы одним из указанных лейблов).
+        sparce_format и format_limit оставлены для совместимости: формат
+        выбирается автоматически.
+        """
         if idx is None:
-            idx = self.labels
-            binary_submask = self.binary_mask
-        else:
-            binary_submask = self[idx]
+            return (self.doc_label_counts > 0).mean()
 
-        if sp.issparse(binary_submask):
-            if binary_submask.shape[1] == 1:
-                return binary_submask.getnnz() / binary_submask.shape[0]
-            else:
-                binary_submask = Target._transform_sparce(
-                    binary_submask, sparce_format, format_limit
-                )
-                has_any_label = binary_submask.max(axis=1).toarray().ravel() > 0
-                return has_any_label.mean()
-        else:
-            if len(binary_submask.shape) == 1:
-                return binary_submask.mean()
-            return binary_submask.any(axis=1).mean()
+        ids = idx if isinstance(idx, np.ndarray) else self._label_ids(idx)
+        if isinstance(ids, int) or (np.ndim(ids) == 0):
+            return self.label_sizes[ids] / self.n_docs
+        if sp.issparse(self.binary_mask):
+            # Строки столбцов CSC-среза: документы с хотя бы одним лейблом
+            covered = np.unique(self.csc[:, ids].indices)
+            return len(covered) / self.n_docs
+        return self.binary_mask[:, ids].any(axis=1).mean()
 
     def get_sizes(
         self,
@@ -130,120 +364,212 @@ class Target:
         sparce_format: Literal["csc", "csr"] = "csr",
         format_limit: int = 1000,
     ) -> np.ndarray | int:
-        """Возвращает количество документов для каждого лейбла."""
-        binary_submask = None
+        """
+        Возвращает количество документов для каждого лейбла.
+        sparce_format и format_limit оставлены для совместимости.
+        """
         if idx is None:
-            idx = self.labels
-            binary_submask = self.binary_mask
+            return self.label_sizes.copy()
+
+        ids = idx if isinstance(idx, np.ndarray) else self._label_ids(idx)
+        sizes = self.label_sizes[ids]
+        if np.ndim(sizes) == 0 or (not self.sparse and sizes.size == 1):
+            return int(np.asarray(sizes).ravel()[0])
+        return sizes
+
+    def cluster_assignment(
+        self,
+        clusters: dict[str, list[str]],
+        missing: MissingLabels = "drop",
+        other_label: str = "other",
+    ) -> tuple[list[str], sp.csr_matrix]:
+        """
+        Лейблы кластеров и разреженная матрица назначения n_labels x n_clusters.
+        Лейблы, которых нет ни в одном кластере: "drop" — отбрасываются,
+        "own" — становятся отдельными кластерами, "other" — попадают в общий
+        кластер other_label. Лейблы кластеров, которых нет в Target, игнорируются.
+        """
+        cluster_labels = [str(cluster) for cluster in clusters]
+        rows: list[int] = []
+        cols: list[int] = []
+        for col, hubs in enumerate(clusters.values()):
+            for hub in hubs:
+                row = self.labels_to_ids.get(hub)
+                if row is not None:
+                    rows.append(row)
+                    cols.append(col)
+
+        mapped = np.zeros(len(self.labels), dtype=bool)
+        mapped[rows] = True
+        unmapped = np.flatnonzero(~mapped).tolist()
+        if missing == "own":
+            rows += unmapped
+            cols += range(len(cluster_labels), len(cluster_labels) + len(unmapped))
+            cluster_labels += [self.labels[i] for i in unmapped]
+        elif missing == "other":
+            if unmapped:
+                rows += unmapped
+                cols += [len(cluster_labels)] * len(unmapped)
+                cluster_labels.append(other_label)
+        elif missing != "drop":
+            raise ValueError(
+                f"Missing policy {missing} not supported. Use 'drop', 'own' or 'other'"
+            )
+
+        assignment = sp.csr_matrix(
+            (np.ones(len(rows), dtype=np.int32), (rows, cols)),
+            shape=(len(self.labels), len(cluster_labels)),
+        )
+        assignment.data[:] = 1
+        return cluster_labels, assignment
+
+    def project(
+        self,
+        clusters: dict[str, list[str]] | None = None,
+        missing: MissingLabels = "drop",
+        other_label: str = "other",
+    ) -> "Target":
+        """
+        Target уровня кластеров: документ относится к кластеру, если у него
+        есть хотя бы один лейбл кластера (binary_mask @ assignment > 0).
+        По умолчанию кластеры читаются из data/targets/clusters.json.
+        Проекции кэшируются, исходный Target доступен через parent.
+        """
+        if clusters is None:
+            clusters = load_clusters()
+        key = (json.dumps(clusters, sort_keys=True), missing, other_label)
+        projections = self.__dict__.setdefault("_projections", {})
+        if key in projections:
+            return projections[key]  # type: ignore[no-any-return]
+
+        labels, assignment = self.cluster_assignment(clusters, missing, other_label)
+        mask = sp.csr_matrix(self.csr.astype(np.int32) @ assignment)
+        mask.data = (mask.data > 0).astype(np.int64)
+        mask.eliminate_zeros()
+
+        projected = Target.__new__(Target)
+        projected.dataset = self.dataset
+        projected.column_name = self.column_name
+        projected.labels = labels
+        projected.labels_to_ids = Target._label_to_id(labels)
+        projected.sparse = self.sparse
+        if self.sparse:
+            projected.binary_mask = mask.tocsc()
+            projected.__dict__["csr"] = mask
         else:
-            binary_submask = self[idx]
+            projected.binary_mask = mask.toarray().astype(bool)
+        projected.parent = self
+        projected.assignment = assignment
+        projections[key] = projected
+        return projected
 
-        if sp.issparse(binary_submask):
-            binary_submask = Target._transform_sparce(
-                binary_submask, sparce_format, format_limit
+    @staticmethod
+    def _top_n_per_row(
+        scores: sp.csr_matrix, n: int, chunk_size: int, n_jobs: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Индексы и значения top-n по каждой строке разреженной матрицы,
+        отсортированные по убыванию. Строки обрабатываются блоками по
+        chunk_size, блоки — параллельно в n_jobs потоках.
+        """
+        n_rows, n_cols = scores.shape
+        n = min(n, n_cols)
+        top_idx = np.zeros((n_rows, n), dtype=np.int64)
+        top_scores = np.zeros((n_rows, n), dtype=np.float32)
+        if n == 0:
+            return top_idx, top_scores
+
+        def process(start: int) -> None:
+            block = scores[start : start + chunk_size].toarray()
+            idx = np.argpartition(-block, n - 1, axis=1)[:, :n]
+            values = np.take_along_axis(block, idx, axis=1)
+            order = np.argsort(-values, axis=1, kind="stable")
+            top_idx[start : start + len(block)] = np.take_along_axis(idx, order, 1)
+            top_scores[start : start + len(block)] = np.take_along_axis(
+                values, order, 1
             )
-            result = binary_submask.sum(axis=0)
-            result = np.array(result)
-            result = result.ravel()
-            if isinstance(idx, (str, int, np.integer)):
-                return int(result[0]) if result.size == 1 else int(result)
-            return result
+
+        starts = range(0, n_rows, chunk_size)
+        if n_jobs > 1:
+            with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+                list(executor.map(process, starts))
         else:
-            result = binary_submask.sum(axis=0)
-            if np.isscalar(result) or (hasattr(result, "size") and result.size == 1):
-                return int(result)
-            return result.astype(int)
+            for start in starts:
+                process(start)
+        return top_idx, top_scores
 
     def get_top_words_per_label(
         self,
-        text_column: str,
+        text_column: str | None = None,
         n_words: int = 10,
         method: Literal["frequency", "tfidf"] = "tfidf",
         max_features: int = 10000,
         min_df: int = 2,
         ngram_range: tuple[int, int] = (1, 1),
+        vectorizer: TfidfVectorizer | None = None,
+        text_matrix: sp.spmatrix | np.ndarray | None = None,
+        feature_names: Sequence[str] | None = None,
+        chunk_size: int = 256,
+        n_jobs: int = 1,
     ) -> dict[str, list[tuple[str, float]]]:
-        """Извлекает топ-N слов для каждого лейбла."""
-
-        if text_column not in self.dataset.columns:
-            raise ValueError(f"Column {text_column} not found in dataset")
-
-        labels_to_process = self.labels
-        texts = self.dataset[text_column].fillna("")
-
-        vectorizer = TfidfVectorizer(
-            max_features=max_features,
-            min_df=min_df,
-            ngram_range=ngram_range,
-            dtype=np.float32,
-        )
-
-        text_matrix = vectorizer.fit_transform(texts)
-        feature_names = np.array(vectorizer.get_feature_names_out())
-
-        if sp.issparse(self.binary_mask):
-            label_matrix = self.binary_mask.astype(np.float32)
-        else:
-            label_matrix = sp.csr_matrix(self.binary_mask, dtype=np.float32)
-
-        results = {}
-
-        if method == "frequency":
-            label_word_matrix = label_matrix.T @ text_matrix
-
-            for i, label in enumerate(labels_to_process):
-                if sp.issparse(label_word_matrix):
-                    scores = label_word_matrix[i].toarray().ravel()
-                else:
-                    scores = np.array(label_word_matrix[i]).ravel()
-
-                if len(scores) > n_words:
-                    top_indices = np.argpartition(scores, -n_words)[-n_words:]
-                else:
-                    top_indices = np.arange(len(scores))
-                top_indices = top_indices[np.argsort(-scores[top_indices])]
-
-                results[label] = [
-                    (feature_names[idx], float(scores[idx]))
-                    for idx in top_indices
-                    if scores[idx] > 0
-                ]
-
-        elif method == "tfidf":
-            label_doc_counts = np.array(label_matrix.sum(axis=0)).ravel()
-
-            label_word_matrix = label_matrix.T @ text_matrix
-
-            total_word_freq = np.array(text_matrix.sum(axis=0)).ravel() + 1e-10
-
-            for i, label in enumerate(labels_to_process):
-                if label_doc_counts[i] == 0:
-                    results[label] = []
-                    continue
-
-                if sp.issparse(label_word_matrix):
-                    label_word_scores = label_word_matrix[i].toarray().ravel()
-                else:
-                    label_word_scores = np.array(label_word_matrix[i]).ravel()
-
-                avg_tfidf = label_word_scores / max(label_doc_counts[i], 1)
-
-                scores = avg_tfidf / (total_word_freq / len(texts))
-
-                if len(scores) > n_words:
-                    top_indices = np.argpartition(scores, -n_words)[-n_words:]
-                else:
-                    top_indices = np.arange(len(scores))
-                top_indices = top_indices[np.argsort(-scores[top_indices])]
-
-                results[label] = [
-                    (feature_names[idx], float(scores[idx]))
-                    for idx in top_indices
-                    if scores[idx] > 0
-                ]
-        else:
+        """
+        Извлекает топ-N слов для каждого лейбла.
+
+        Матрица документы x слова берётся из text_matrix, иначе строится
+        vectorizer (уже обученным) или новым TfidfVectorizer по text_column.
+        Названия слов берутся из feature_names или из vectorizer.
+        Оценки считаются для всех лейблов сразу разреженными операциями,
+        top-N выбирается блоками по chunk_size строк в n_jobs потоках.
+        """
+        if method not in ("frequency", "tfidf"):
             raise ValueError(
                 f"Method {method} not supported. Use 'frequency' or 'tfidf'"
             )
 
+        if text_matrix is None:
+            dataset = self._require_dataset()
+            if text_column is None or text_column not in dataset.columns:
+                raise ValueError(f"Column {text_column} not found in dataset")
+            texts = dataset[text_column].fillna("")
+            if vectorizer is None:
+                vectorizer = TfidfVectorizer(
+                    max_features=max_features,
+                    min_df=min_df,
+                    ngram_range=ngram_range,
+                    dtype=np.float32,
+                )
+                text_matrix = vectorizer.fit_transform(texts)
+            else:
+                text_matrix = vectorizer.transform(texts)
+
+        if feature_names is None:
+            if vectorizer is None:
+                raise ValueError("feature_names or vectorizer is required")
+            feature_names = vectorizer.get_feature_names_out()
+        feature_names = np.asarray(feature_names)
+
+        text_matrix = sp.csr_matrix(text_matrix, dtype=np.float32)
+        label_matrix = self.csr.astype(np.float32)
+        label_word_matrix = sp.csr_matrix(label_matrix.T @ text_matrix)
+
+        if method == "tfidf":
+            n_docs = text_matrix.shape[0]
+            label_doc_counts = self.label_sizes.astype(np.float32)
+            total_word_freq = np.asarray(text_matrix.sum(axis=0)).ravel() + 1e-10
+            # Средний tf-idf слова в лейбле / средний tf-idf слова по корпусу
+            label_word_matrix = (
+                sp.diags(1.0 / np.maximum(label_doc_counts, 1))
+                @ label_word_matrix
+                @ sp.diags((n_docs / total_word_freq).astype(np.float32))
+            ).tocsr()
+
+        top_idx, top_scores = Target._top_n_per_row(
+            label_word_matrix, n_words, chunk_size, n_jobs
+        )
+        results = {}
+        for label, idx, scores in zip(self.labels, top_idx, top_scores):
+            keep = scores > 0
+            results[label] = list(
+                zip(feature_names[idx[keep]].tolist(), scores[keep].tolist())
+            )
         return results
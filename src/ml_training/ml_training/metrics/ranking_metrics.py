@@ -22,8 +22,9 @@ class RankingMetrics:
     ) -> np.ndarray:
         discount_array = np.array([discount(rank) for rank in range(len(self.target))])
         row_dcgs = []
+        csr = self.target.csr
         for i, predicts in enumerate(self.sorted_predicts):
-            scores = self.target[predicts][i].toarray().ravel()
+            scores = csr[i].toarray().ravel()[predicts]
             row_dcgs.append(scores.T @ discount_array)
 
         return np.array(row_dcgs)
@@ -31,10 +32,8 @@ class RankingMetrics:
     def ndcg(
         self, discount: Callable[[int], float] = lambda rank: 1.0 / (rank + 1.0)
     ) -> np.ndarray:
-        counts = np.array(self.target.binary_mask.sum(axis=1).flatten())
+        counts = self.target.doc_label_counts
         discount_array = np.array([discount(rank) for rank in range(len(self.target))])
-        norm_dcgs = []
-        for count in counts[0]:
-            norm_dcgs.append(np.sum(discount_array[:count]))
+        norm_dcgs = np.concatenate([[0.0], np.cumsum(discount_array)])[counts]
 
-        return self.dcg(discount) / np.array(norm_dcgs)
+        return self.dcg(discount) / norm_dcgs
@@ -4,15 +4,23 @@ from typing import Any
 import numpy as np
 import torch
 
+from ml_training.data.hub_vocabulary import HubVocabulary
 from ml_training.data.targets import Target
 
 
 class HubEncoder:
-    hub_to_vec: dict[str, np.ndarray]
+    """
+    Encodes a hub as the mean embedding of its texts. Row i of `hub_matrix`
+    is the vector of the hub with id i in `vocabulary`.
+    """
+
+    vocabulary: HubVocabulary
+    hub_matrix: np.ndarray
     dim: int
 
     def __init__(self, dim: int = 5000):
-        self.hub_to_vec = {}
+        self.vocabulary = HubVocabulary()
+        self.hub_matrix = np.zeros((0, dim))
         self.dim = dim
 
     def fit(self, target: Target, text_embeddings: np.ndarray) -> np.ndarray:
@@ -20,38 +28,41 @@ class HubEncoder:
             self.dim, text_embeddings.shape[1]
         )
 
-        for hub in target.labels:
-            hub_mask = np.array(target[hub])
-            sum_embeds = text_embeddings.T @ hub_mask
-            n_matches = sum(hub_mask)
-            if n_matches > 0:
-                self.hub_to_vec[hub] = (sum_embeds * 1.0) / (n_matches * 1.0)
-            else:
-                self.hub_to_vec[hub] = sum_embeds
+        # Labels of a Target built with a shared vocabulary are its names,
+        # so hub ids stay the same as in the rest of the pipeline
+        self.vocabulary = HubVocabulary(target.labels)
+        sum_embeds = np.asarray(target.csc.T @ text_embeddings, dtype=np.float64)
+        n_matches = np.maximum(target.label_sizes, 1)
+        self.hub_matrix = sum_embeds / n_matches[:, None]
+        return self.hub_matrix
 
     def transform(self, labels: list[str]) -> np.ndarray:
-        result = []
-
-        for hub in labels:
-            if hub in self.hub_to_vec.keys():
-                result.append(self.hub_to_vec[hub])
-            else:
-                result.append(np.zeros(self.dim))
-
-        return np.array(result)
+        ids = np.array(
+            [self.vocabulary.ids.get(hub, -1) for hub in labels], dtype=np.int64
+        )
+        result = np.zeros((len(labels), self.dim))
+        known = ids >= 0
+        result[known] = self.hub_matrix[ids[known]]
+        return result
 
     def state_dict(self) -> Any:
-        hub_to_vec_tensors = {
-            hub: torch.from_numpy(vec) for hub, vec in self.hub_to_vec.items()
+        return {
+            "dim": self.dim,
+            "hubs": list(self.vocabulary.names),
+            "hub_matrix": torch.from_numpy(self.hub_matrix),
         }
 
-        return {"dim": self.dim, "hub_to_vec": hub_to_vec_tensors}
-
     def load_state_dict(self, state_dict: Any) -> None:
         self.dim = state_dict["dim"]
-        self.hub_to_vec = {
-            hub: vec.numpy() for hub, vec in state_dict["hub_to_vec"].items()
-        }
+        if "hub_to_vec" in state_dict:
+            # Checkpoints saved before the shared vocabulary: hub -> vector
+            hub_to_vec = state_dict["hub_to_vec"]
+            self.vocabulary = HubVocabulary(hub_to_vec)
+            vectors = [vec.numpy() for vec in hub_to_vec.values()]
+            self.hub_matrix = np.stack(vectors) if vectors else np.zeros((0, self.dim))
+            return
+        self.vocabulary = HubVocabulary(state_dict["hubs"])
+        self.hub_matrix = state_dict["hub_matrix"].numpy()
 
     def save(self, path: Path | str) -> None:
         torch.save(self.state_dict(), path)
@@ -1,17 +1,69 @@
-import io
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Optional
 
-import jsonlines
+import numpy as np
 import pandas as pd
-import zstandard as zstd
 
+from ml_training.data.jsonl_zst import (
+    DEFAULT_FRAME_ROWS,
+    JsonlZstWriter,
+    write_manifest,
+)
 
-def save_jsonl_zst(df: pd.DataFrame, path: Path) -> None:
+
+def _write_jsonl_zst(
+    df: pd.DataFrame, path: Path, frame_rows: int, level: int, threads: int
+) -> int:
+    with JsonlZstWriter(
+        path, frame_rows=frame_rows, level=level, threads=threads
+    ) as writer:
+        writer.write_dataframe(df)
+    return len(df)
+
+
+def save_jsonl_zst(
+    df: pd.DataFrame,
+    path: Path,
+    num_shards: Optional[int] = None,
+    frame_rows: int = DEFAULT_FRAME_ROWS,
+    level: int = 3,
+    threads: Optional[int] = None,
+) -> None:
+    """
+    Save a DataFrame as jsonl.zst made of independent zstd frames.
+
+    Rows are serialised chunk by chunk from the columns and frames are
+    compressed on `threads` threads (default: one per CPU) at zstd `level`.
+    For producers without a DataFrame, use JsonlZstWriter directly.
+
+    With `num_shards`, `path` becomes a directory with `num_shards` files
+    written in parallel and a manifest.json, readable by HabrDataset.
+    """
     path = Path(path)
-    path.parent.mkdir(parents=True, exist_ok=True)
-    cctx = zstd.ZstdCompressor(level=3)
-    with open(path, "wb") as f:
-        with cctx.stream_writer(f) as compressor:
-            writer = jsonlines.Writer(io.TextIOWrapper(compressor, encoding="utf-8"))
-            writer.write_all(df.to_dict(orient="records"))
-            writer.close()
+    threads = threads if threads is not None else os.cpu_count() or 1
+    if num_shards is None:
+        _write_jsonl_zst(df, path, frame_rows, level, threads)
+        return
+
+    path.mkdir(parents=True, exist_ok=True)
+    shard_paths = [
+        path / f"part-{i:05d}-of-{num_shards:05d}.jsonl.zst" for i in range(num_shards)
+    ]
+    bounds = np.linspace(0, len(df), num_shards + 1, dtype=int)
+    shard_threads = max(1, threads // num_shards)
+    with ThreadPoolExecutor(max_workers=num_shards) as executor:
+        rows = list(
+            executor.map(
+                lambda i: _write_jsonl_zst(
+                    df.iloc[bounds[i] : bounds[i + 1]],
+                    shard_paths[i],
+                    frame_rows,
+                    level,
+                    shard_threads,
+                ),
+                range(num_shards),
+            )
+        )
+    write_manifest(path, shard_paths, rows)
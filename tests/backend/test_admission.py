@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from backend.utils.admission import AdmissionGate, ModelOverloadedError
+
+
+def make_gate(
+    max_concurrency: int = 1, max_queue_size: int = 1, queue_timeout: float = 1.0
+) -> AdmissionGate:
+    return AdmissionGate(
+        "model.zip",
+        max_concurrency=max_concurrency,
+        max_queue_size=max_queue_size,
+        queue_timeout=queue_timeout,
+        retry_after=3,
+    )
+
+
+def test_admit_tracks_in_flight() -> None:
+    gate = make_gate()
+
+    async def run() -> None:
+        async with gate.admit():
+            assert gate.in_flight == 1
+        assert gate.in_flight == 0
+
+    asyncio.run(run())
+
+
+def test_full_queue_rejects_immediately() -> None:
+    gate = make_gate(max_concurrency=1, max_queue_size=1)
+
+    async def hold(release: asyncio.Event) -> None:
+        async with gate.admit():
+            await release.wait()
+
+    async def run() -> None:
+        release = asyncio.Event()
+        running = asyncio.create_task(hold(release))
+        while gate.in_flight < 1:
+            await asyncio.sleep(0)
+        waiting = asyncio.create_task(hold(release))
+        while gate.queued < 1:
+            await asyncio.sleep(0)
+        assert gate.in_flight == 1
+        assert gate.queued == 1
+
+        with pytest.raises(ModelOverloadedError) as exc_info:
+            async with gate.admit():
+                pass
+        assert exc_info.value.retry_after == 3
+        assert gate.rejected == 1
+
+        release.set()
+        await asyncio.gather(running, waiting)
+        assert gate.in_flight == 0
+        assert gate.queued == 0
+
+    asyncio.run(run())
+
+
+def test_queue_timeout_rejects() -> None:
+    gate = make_gate(max_concurrency=1, max_queue_size=5, queue_timeout=0.01)
+
+    async def run() -> None:
+        async with gate.admit():
+            with pytest.raises(ModelOverloadedError):
+                async with gate.admit():
+                    pass
+        assert gate.rejected == 1
+        assert gate.queued == 0
+
+    asyncio.run(run())
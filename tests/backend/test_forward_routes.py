@@ -0,0 +1,149 @@
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from backend.db import get_db  # noqa: E402
+from backend.main import app  # noqa: E402
+from backend.routes import forward_routes  # noqa: E402
+from backend.routes.forward_routes import _fuse_scores  # noqa: E402
+from backend.utils.admission import ModelOverloadedError  # noqa: E402
+from core.schemas.api.forward import HubScore  # noqa: E402
+
+
+class FakeSession:
+    def __init__(self) -> None:
+        self.added: list[Any] = []
+
+    def add(self, obj: Any) -> None:
+        self.added.append(obj)
+
+    async def commit(self) -> None:
+        pass
+
+
+class FakeRunner:
+    def __init__(self, model_key: str):
+        self.model_key = model_key
+
+    def predict_proba_hubs(self, text: str, hubs: list[str]) -> list[float]:
+        # model "a" prefers the first hub, model "b" the last one
+        scores = [0.9 - 0.1 * i for i in range(len(hubs))]
+        return scores if self.model_key.startswith("a") else scores[::-1]
+
+
+class OverloadedGate:
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        raise ModelOverloadedError("b.zip", retry_after=3)
+        yield
+
+
+@pytest.fixture
+def client(monkeypatch: pytest.MonkeyPatch) -> Iterator[TestClient]:
+    session = FakeSession()
+
+    async def fake_get_db() -> AsyncIterator[FakeSession]:
+        yield session
+
+    @contextmanager
+    def fake_use_model_runner(model_key: str) -> Iterator[FakeRunner]:
+        yield FakeRunner(model_key)
+
+    monkeypatch.setattr(forward_routes, "list_models", lambda: {"a.zip", "b.zip"})
+    monkeypatch.setattr(forward_routes, "use_model_runner", fake_use_model_runner)
+    app.dependency_overrides[get_db] = fake_get_db
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def model_results() -> list[list[HubScore]]:
+    return [
+        [HubScore(hub="python", score=0.9), HubScore(hub="webdev", score=0.1)],
+        [HubScore(hub="webdev", score=0.6), HubScore(hub="python", score=0.5)],
+    ]
+
+
+def test_fuse_scores_mean(model_results: list[list[HubScore]]) -> None:
+    fused = _fuse_scores(model_results, "mean")
+
+    assert [item.hub for item in fused] == ["python", "webdev"]
+    assert fused[0].score == pytest.approx(0.7)
+    assert fused[1].score == pytest.approx(0.35)
+
+
+def test_fuse_scores_rank_ignores_score_scale(
+    model_results: list[list[HubScore]],
+) -> None:
+    fused = _fuse_scores(model_results, "rank")
+
+    assert fused[0].score == pytest.approx(fused[1].score)
+
+
+def test_compare_returns_scores_per_model(client: TestClient) -> None:
+    response = client.post(
+        "/forward/compare",
+        json={
+            "model_names": ["a", "b"],
+            "text": "text",
+            "hubs": ["python", "webdev"],
+            "fusion": "mean",
+        },
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["error"] is None
+    assert [item["model_name"] for item in body["results"]] == ["a", "b"]
+    assert body["results"][0]["result"][0]["hub"] == "python"
+    assert body["results"][1]["result"][0]["hub"] == "webdev"
+    assert {item["hub"] for item in body["fused"]} == {"python", "webdev"}
+
+
+def test_compare_unknown_model_uses_compare_body(client: TestClient) -> None:
+    response = client.post(
+        "/forward/compare", json={"model_names": ["a", "missing"], "text": "text"}
+    )
+
+    assert response.status_code == 400
+    body = response.json()
+    assert body == {
+        "results": None,
+        "fused": None,
+        "error": "Models ['missing.zip'] are not found",
+    }
+
+
+def test_compare_overloaded_model_returns_429(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(
+        forward_routes, "get_admission_gate", lambda _: OverloadedGate()
+    )
+
+    response = client.post(
+        "/forward/compare", json={"model_names": ["a", "b"], "text": "text"}
+    )
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "3"
+    body = response.json()
+    assert set(body) == {"results", "fused", "error"}
+    assert "overloaded" in body["error"]
+
+
+def test_forward_errors_keep_forward_body(client: TestClient) -> None:
+    response = client.post("/forward", json={"model_name": "missing", "text": "t"})
+
+    assert response.status_code == 400
+    assert response.json() == {
+        "result": None,
+        "error": "Model 'missing.zip' is not found",
+    }
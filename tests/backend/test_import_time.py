@@ -0,0 +1,36 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+BACKEND_ROOT = Path(__file__).resolve().parents[2] / "src" / "backend"
+IMPORT_TIME_BUDGET_SECONDS = 3.0
+LAZY_MODULES = ["boto3", "onnxruntime"]
+
+SCRIPT = """
+import json, sys
+import backend.main
+print(json.dumps([name for name in {modules} if name in sys.modules]))
+"""
+
+
+def test_backend_main_imports_within_budget() -> None:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(BACKEND_ROOT), *sys.path]))
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT.format(modules=LAZY_MODULES)],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - started
+
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout) == []
+    assert elapsed < IMPORT_TIME_BUDGET_SECONDS
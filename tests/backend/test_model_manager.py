@@ -0,0 +1,185 @@
+import multiprocessing
+import os
+import threading
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+pytest.importorskip("boto3")
+pytest.importorskip("onnxruntime")
+
+from backend.utils import model_manager, onnx_runner  # noqa: E402
+from backend.utils.s3_loader import ModelVersion  # noqa: E402
+
+
+class FakeRunner:
+    def __init__(self, model_key: str, version: ModelVersion):
+        self.model_key = model_key
+        self.version = version
+        self.warmed_up = False
+
+    def warmup(self) -> None:
+        self.warmed_up = True
+
+
+@pytest.fixture
+def remote_version(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> dict[str, str]:
+    # Version locks live in models_cache relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    current = {"tag": "v1"}
+
+    def fake_get_model_version(_: str) -> ModelVersion:
+        return ModelVersion(tag=current["tag"], download_args={})
+
+    monkeypatch.setattr(model_manager, "ONNXInference", FakeRunner)
+    monkeypatch.setattr(model_manager, "get_model_version", fake_get_model_version)
+    monkeypatch.setattr(model_manager, "_handles", model_manager.OrderedDict())
+    monkeypatch.setattr(model_manager, "_drained", [])
+    monkeypatch.setattr(model_manager, "_load_locks", {})
+    return current
+
+
+@pytest.fixture
+def removed(monkeypatch: pytest.MonkeyPatch) -> list[tuple[str, str]]:
+    calls: list[tuple[str, str]] = []
+
+    def recording_remove_model(model_key: str, version: ModelVersion) -> bool:
+        result = onnx_runner.remove_model(model_key, version)
+        if result:
+            calls.append((model_key, version.tag))
+        return result
+
+    monkeypatch.setattr(model_manager, "remove_model", recording_remove_model)
+    return calls
+
+
+def current_runner(model_key: str) -> Any:
+    with model_manager.use_model_runner(model_key) as runner:
+        return runner
+
+
+def test_refresh_without_new_version_keeps_runner(remote_version: Any) -> None:
+    runner = current_runner("model.zip")
+
+    assert not model_manager.refresh_model("model.zip")
+    assert current_runner("model.zip") is runner
+
+
+def test_refresh_swaps_in_warm_runner(remote_version: Any) -> None:
+    old_runner = current_runner("model.zip")
+    remote_version["tag"] = "v2"
+
+    assert model_manager.refresh_model("model.zip")
+    new_runner = current_runner("model.zip")
+    assert new_runner is not old_runner
+    assert new_runner.version.tag == "v2"
+    assert new_runner.warmed_up
+
+
+def test_old_runner_drains_after_in_flight_requests(remote_version: Any) -> None:
+    with model_manager.use_model_runner("model.zip") as old_runner:
+        old_handle = model_manager._handles["model.zip"]
+        remote_version["tag"] = "v2"
+        model_manager.refresh_model("model.zip")
+
+        assert old_handle.retired
+        assert old_handle.runner is old_runner
+
+    assert old_handle.runner is None
+
+
+def test_refresh_does_not_block_cold_loads(
+    remote_version: Any, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    model_manager.preload_model("a.zip")
+    remote_version["tag"] = "v2"
+    loading = threading.Event()
+    finish = threading.Event()
+
+    class SlowRunner(FakeRunner):
+        def warmup(self) -> None:
+            if self.model_key == "a.zip":
+                loading.set()
+                assert finish.wait(5)
+            super().warmup()
+
+    monkeypatch.setattr(model_manager, "ONNXInference", SlowRunner)
+    refresh = threading.Thread(target=model_manager.refresh_model, args=("a.zip",))
+    refresh.start()
+    try:
+        assert loading.wait(5)
+        # A cold load of another model completes while a.zip is still loading
+        assert current_runner("b.zip").warmed_up
+    finally:
+        finish.set()
+        refresh.join()
+    assert current_runner("a.zip").version.tag == "v2"
+
+
+def test_refresh_prunes_replaced_version(remote_version: Any, removed: Any) -> None:
+    model_manager.preload_model("model.zip")
+    remote_version["tag"] = "v2"
+
+    model_manager.refresh_models()
+
+    assert removed == [("model.zip", "v1")]
+    assert not Path("models_cache", "v1").exists()
+    assert Path("models_cache", "v2", "model.zip.lock").exists()
+    model_manager.refresh_models()
+    assert removed == [("model.zip", "v1")]
+
+
+def test_version_in_use_is_pruned_after_release(
+    remote_version: Any, removed: Any
+) -> None:
+    with model_manager.use_model_runner("model.zip"):
+        remote_version["tag"] = "v2"
+        model_manager.refresh_models()
+        assert removed == []
+
+    model_manager.prune_models()
+    assert removed == [("model.zip", "v1")]
+
+
+def test_reloaded_version_is_not_pruned(
+    remote_version: Any, removed: Any, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(model_manager.settings, "MODEL_CACHE_SIZE", 1)
+    model_manager.preload_model("a.zip")
+    model_manager.preload_model("b.zip")
+    model_manager.preload_model("a.zip")
+
+    model_manager.prune_models()
+
+    assert removed == [("b.zip", "v1")]
+
+
+def _hold_version_lock(started: Any, done: Any) -> None:
+    fd = onnx_runner.lock_model("model.zip", ModelVersion("v1", {}))
+    started.set()
+    done.wait(5)
+    os.close(fd)
+
+
+def test_version_locked_by_another_process_is_not_pruned(
+    remote_version: Any, removed: Any
+) -> None:
+    context = multiprocessing.get_context("fork")
+    started, done = context.Event(), context.Event()
+    worker = context.Process(target=_hold_version_lock, args=(started, done))
+    worker.start()
+    try:
+        assert started.wait(5)
+        model_manager.preload_model("model.zip")
+        remote_version["tag"] = "v2"
+        model_manager.refresh_models()
+        assert removed == []
+        assert Path("models_cache", "v1").exists()
+    finally:
+        done.set()
+        worker.join()
+
+    # The version is free once no process holds its lock any more
+    assert onnx_runner.remove_model("model.zip", ModelVersion("v1", {}))
+    assert not Path("models_cache", "v1").exists()
@@ -0,0 +1,78 @@
+import json
+import zipfile
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pytest
+
+from backend.utils import onnx_runner
+
+
+@pytest.fixture
+def model_archive(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    archive_path = tmp_path / "v1" / "model.zip"
+    archive_path.parent.mkdir()
+    with zipfile.ZipFile(archive_path, "w") as zipf:
+        zipf.writestr(
+            "hub_encoder.json",
+            json.dumps({"python": [1.0, 2.0], "ml": [3.0, 4.0]}),
+        )
+        zipf.writestr("metadata.json", json.dumps({"name": "model"}))
+
+    monkeypatch.setattr(onnx_runner, "download_model", lambda *_: str(archive_path))
+    return archive_path
+
+
+def test_prepare_model_writes_hub_matrix(model_archive: Path) -> None:
+    model_dir = onnx_runner.prepare_model("model.zip")
+
+    assert model_dir == model_archive.with_suffix("")
+    hub_matrix = np.load(model_dir / onnx_runner.HUB_MATRIX_FILE)
+    assert hub_matrix.dtype == np.float32
+    np.testing.assert_array_equal(hub_matrix, [[1.0, 2.0], [3.0, 4.0]])
+    hub_names = json.loads((model_dir / onnx_runner.HUB_NAMES_FILE).read_text())
+    assert hub_names == ["python", "ml"]
+
+    # A second call reuses the extracted directory
+    assert onnx_runner.prepare_model("model.zip") == model_dir
+
+
+def test_runner_memory_maps_hub_matrix(
+    model_archive: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(onnx_runner, "_create_session", lambda _: object())
+    load_calls: list[dict[str, Any]] = []
+    np_load = np.load
+
+    def recording_load(*args: Any, **kwargs: Any) -> Any:
+        load_calls.append(kwargs)
+        return np_load(*args, **kwargs)
+
+    monkeypatch.setattr(onnx_runner.np, "load", recording_load)
+
+    runner = onnx_runner.ONNXInference("model.zip")
+
+    assert load_calls == [{"mmap_mode": "r"}]
+    assert isinstance(runner.hub_matrix, np.memmap)
+    assert not runner.hub_matrix.flags.writeable
+    np.testing.assert_array_equal(runner.encode_hub("ml"), [[3.0, 4.0]])
+    np.testing.assert_array_equal(runner.encode_hub("unknown"), [[0.0, 0.0]])
+
+
+def test_remove_model_deletes_version_files(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    version = onnx_runner.ModelVersion("v1", {})
+    version_dir = tmp_path / "models_cache" / "v1"
+    (version_dir / "model").mkdir(parents=True)
+    (version_dir / "model" / onnx_runner.HUB_NAMES_FILE).write_text("[]")
+    (version_dir / "model.zip").write_bytes(b"zip")
+    (version_dir / "other.zip").write_bytes(b"zip")
+
+    onnx_runner.remove_model("models/model.zip", version)
+    assert sorted(p.name for p in version_dir.iterdir()) == ["other.zip"]
+
+    onnx_runner.remove_model("models/other.zip", version)
+    assert not version_dir.exists()
@@ -0,0 +1,86 @@
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+boto3_transfer = pytest.importorskip("boto3.s3.transfer")
+
+from backend.utils import s3_loader  # noqa: E402
+
+
+class StubS3Client:
+    """Serves one object and validates download arguments like boto3 does."""
+
+    def __init__(self, etags: list[str], version_id: str | None = None):
+        self.etags = etags
+        self.version_id = version_id
+        self.downloads: list[dict[str, Any]] = []
+
+    def head_object(self, Bucket: str, Key: str) -> dict[str, Any]:
+        head: dict[str, Any] = {"ETag": self.etags[0]}
+        if len(self.etags) > 1:
+            self.etags.pop(0)
+        if self.version_id is not None:
+            head["VersionId"] = self.version_id
+        return head
+
+    def download_file(
+        self, Bucket: str, Key: str, Filename: str, ExtraArgs: dict[str, str]
+    ) -> None:
+        allowed = boto3_transfer.S3Transfer.ALLOWED_DOWNLOAD_ARGS
+        for key in ExtraArgs:
+            if key not in allowed:
+                raise ValueError(f"Invalid extra_args key '{key}'")
+        self.downloads.append(ExtraArgs)
+        Path(Filename).write_bytes(b"model")
+
+
+@pytest.fixture
+def in_tmp_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    # Models are cached relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def use_client(monkeypatch: pytest.MonkeyPatch, client: StubS3Client) -> None:
+    monkeypatch.setattr(s3_loader, "get_s3_client", lambda: client)
+
+
+def test_versioned_bucket_pins_version_id(
+    in_tmp_dir: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    client = StubS3Client(['"abc"'], version_id="v1")
+    use_client(monkeypatch, client)
+
+    version = s3_loader.get_model_version("models/model.zip")
+    local_path = s3_loader.download_model("models/model.zip", version)
+
+    assert version == s3_loader.ModelVersion("v1", {"VersionId": "v1"})
+    assert client.downloads == [{"VersionId": "v1"}]
+    assert Path(local_path) == Path("models_cache", "v1", "model.zip")
+    assert Path(local_path).read_bytes() == b"model"
+
+
+def test_unversioned_bucket_uses_etag(
+    in_tmp_dir: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    client = StubS3Client(['"abc"'], version_id="null")
+    use_client(monkeypatch, client)
+
+    local_path = s3_loader.download_model("models/model.zip")
+
+    assert client.downloads == [{}]
+    assert Path(local_path) == Path("models_cache", "abc", "model.zip")
+    assert Path(local_path).exists()
+
+
+def test_unversioned_object_changed_during_download(
+    in_tmp_dir: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    client = StubS3Client(['"abc"', '"def"'])
+    use_client(monkeypatch, client)
+
+    with pytest.raises(RuntimeError, match="changed during download"):
+        s3_loader.download_model("models/model.zip")
+
+    assert list(Path("models_cache", "abc").iterdir()) == []
@@ -1,12 +1,19 @@
+import hashlib
 import io
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
+from typing import Iterator
 
 import jsonlines
+import numpy as np
 import pandas as pd
 import pytest
 import zstandard as zstd
 
 from ml_training.data import loaders
+from ml_training.utils import save_jsonl_zst
 
 # Fixtures
 
@@ -20,6 +27,45 @@ def tmp_tiny_csv(tmp_path: Path) -> Path:
     return dataset_path
 
 
+@pytest.fixture
+def range_server() -> Iterator[ThreadingHTTPServer]:
+    """Local HTTP server serving `server.payload` with Range support."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            payload: bytes = self.server.payload  # type: ignore[attr-defined]
+            header = self.headers.get("Range")
+            self.server.ranges.append(header)  # type: ignore[attr-defined]
+            if header is None:
+                self.send_response(200)
+                body = payload
+            else:
+                start, end = header.removeprefix("bytes=").split("-")
+                body = payload[int(start) : int(end) + 1]
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{end}/{len(payload)}")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", '"v1"')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args: object) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.payload = bytes(range(256)) * 40  # type: ignore[attr-defined]
+    server.ranges = []  # type: ignore[attr-defined]
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _server_url(server: ThreadingHTTPServer) -> str:
+    return f"http://127.0.0.1:{server.server_address[1]}/habr.jsonl.zst"
+
+
 # Unit tests
 
 
@@ -107,3 +153,102 @@ def test_load_dataset_reads_zstd_jsonlines(tmp_path: Path) -> None:
     assert isinstance(df, pd.DataFrame)
     assert len(df) == 2
     assert "x" in df.columns
+
+
+def test_download_dataset_parallel_ranges(
+    tmp_path: Path, range_server: ThreadingHTTPServer
+) -> None:
+    payload = range_server.payload  # type: ignore[attr-defined]
+    file_path = tmp_path / "habr.jsonl.zst"
+
+    loaders.download_dataset(
+        local_path=file_path,
+        url=_server_url(range_server),
+        sha256=hashlib.sha256(payload).hexdigest(),
+        num_connections=3,
+        piece_size=1000,
+    )
+
+    assert file_path.read_bytes() == payload
+    assert not (tmp_path / "habr.jsonl.zst.part").exists()
+    assert not (tmp_path / "habr.jsonl.zst.part.json").exists()
+
+
+def test_download_dataset_warns_without_checksum(
+    tmp_path: Path, range_server: ThreadingHTTPServer, caplog: pytest.LogCaptureFixture
+) -> None:
+    file_path = tmp_path / "habr.jsonl.zst"
+
+    loaders.download_dataset(local_path=file_path, url=_server_url(range_server))
+
+    warnings = [r for r in caplog.records if r.levelname == "WARNING"]
+    assert len(warnings) == 1
+    assert "only the size" in warnings[0].getMessage()
+
+
+def test_download_dataset_resumes_partial_file(
+    tmp_path: Path, range_server: ThreadingHTTPServer
+) -> None:
+    payload = range_server.payload  # type: ignore[attr-defined]
+    file_path = tmp_path / "habr.jsonl.zst"
+    part_path = tmp_path / "habr.jsonl.zst.part"
+    part_path.write_bytes(payload[:4000] + bytes(len(payload) - 4000))
+    state = {"size": len(payload), "etag": '"v1"', "piece_size": 1000}
+    (tmp_path / "habr.jsonl.zst.part.json").write_text(
+        json.dumps({**state, "done": [0, 1, 2, 3]})
+    )
+
+    loaders.download_dataset(
+        local_path=file_path, url=_server_url(range_server), piece_size=1000
+    )
+
+    assert file_path.read_bytes() == payload
+    ranges = range_server.ranges  # type: ignore[attr-defined]
+    fetched = sorted(r for r in ranges if r != "bytes=0-0")
+    assert fetched == sorted(
+        f"bytes={start}-{min(start + 1000, len(payload)) - 1}"
+        for start in range(4000, len(payload), 1000)
+    )
+
+
+def test_download_dataset_checksum_mismatch(
+    tmp_path: Path, range_server: ThreadingHTTPServer
+) -> None:
+    file_path = tmp_path / "habr.jsonl.zst"
+
+    with pytest.raises(ValueError, match="Checksum mismatch"):
+        loaders.download_dataset(
+            local_path=file_path, url=_server_url(range_server), sha256="0" * 64
+        )
+
+    assert not file_path.exists()
+    assert not (tmp_path / "habr.jsonl.zst.part").exists()
+
+
+def test_load_dataset_compact_columns(tmp_path: Path) -> None:
+    records = [
+        {"id": 1, "language": "ru", "author": "a", "hubs": ["x", "y"], "html": "<p>"},
+        {"id": 2, "language": "en", "author": None, "hubs": ["y"]},
+        {"id": 3, "language": "ru", "author": "b", "hubs": [], "html": "<p>"},
+    ]
+    fpath = tmp_path / "habr.jsonl.zst"
+    save_jsonl_zst(pd.DataFrame(records), fpath)
+
+    df = loaders.load_dataset_from_zst(
+        local_path=fpath, exclude_columns=["html"], compact=True, chunk_rows=2
+    )
+
+    assert list(df.columns) == ["id", "language", "author", "hubs"]
+    assert df["id"].dtype == np.int32
+    assert df["language"].dtype == "category"
+    assert df["language"].tolist() == ["ru", "en", "ru"]
+    assert df["author"].isna().tolist() == [False, True, False]
+    vocabulary = df.attrs["hub_vocabulary"]
+    assert [vocabulary.decode(hubs) for hubs in df["hubs"]] == [
+        ["x", "y"],
+        ["y"],
+        [],
+    ]
+
+    selected = loaders.load_dataset_from_zst(local_path=fpath, columns=["id"])
+    assert list(selected.columns) == ["id"]
@@ -0,0 +1,60 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from ml_training.data import generate_negatives
+from ml_training.data.generate_negatives import batch_rng, sample_pairs
+from ml_training.data.hub_vocabulary import HubVocabulary
+from ml_training.data.pair_dataset import PairDataset
+from ml_training.utils import save_jsonl_zst
+
+HUB_LISTS = [["a", "b", "c"], ["d"], [], ["b", "e", "f", "a"]]
+VOCABULARY = HubVocabulary("abcdef")
+HUB_TO_CODE = VOCABULARY.ids
+
+
+def test_sample_pairs_respects_limits() -> None:
+    rows, codes, labels = sample_pairs(
+        VOCABULARY.encode(HUB_LISTS),
+        top_count=4,
+        rng=batch_rng(42, 0),
+        max_positives=2,
+        num_negatives=2,
+    )
+
+    assert np.all(np.diff(rows) >= 0)
+    for row, hubs in enumerate(HUB_LISTS):
+        own = {HUB_TO_CODE[hub] for hub in hubs}
+        positives = codes[(rows == row) & (labels == 1)]
+        negatives = codes[(rows == row) & (labels == 0)]
+        assert len(positives) == min(len(hubs), 2)
+        assert set(positives) <= own
+        assert len(negatives) == min(4 - len(own & set(range(4))), 2)
+        assert len(set(negatives)) == len(negatives)
+        assert not set(negatives) & own
+        assert np.all(negatives < 4)
+
+
+def test_sample_pairs_is_reproducible_per_batch() -> None:
+    first = sample_pairs(VOCABULARY.encode(HUB_LISTS), 4, batch_rng(42, 3))
+    second = sample_pairs(VOCABULARY.encode(HUB_LISTS), 4, batch_rng(42, 3))
+    for a, b in zip(first, second):
+        assert np.array_equal(a, b)
+
+
+def test_main_streams_pairs(tmp_path: Path) -> None:
+    input_path = tmp_path / "train.jsonl.zst"
+    output_path = tmp_path / "pairs"
+    df = pd.DataFrame(
+        {"id": range(4), "text": [f"t{i}" for i in range(4)], "hubs": HUB_LISTS}
+    )
+    save_jsonl_zst(df, input_path)
+
+    generate_negatives.main(input_path, output_path)
+
+    pairs = PairDataset(output_path, columns=["text"]).get_dataframe()
+    assert list(pairs.columns) == ["text", "hub", "label"]
+    positives = pairs[pairs["label"] == 1]
+    for text, hub in zip(positives["text"], positives["hub"]):
+        assert hub in HUB_LISTS[int(text[1:])]
@@ -5,7 +5,21 @@ import pandas as pd
 import pytest
 import zstandard as zstd
 
+from ml_training.data.filters import (
+    Between,
+    ContainsAny,
+    Eq,
+    RowFilter,
+    as_row_filters,
+    line_may_match,
+)
 from ml_training.data.habr_dataset import HabrDataset
+from ml_training.data.jsonl_zst import (
+    JsonlZstWriter,
+    read_frame_table,
+    reframe_jsonl_zst,
+)
+from ml_training.utils import save_jsonl_zst
 
 
 @pytest.fixture
@@ -67,3 +81,252 @@ def test_habr_dataset_columns_selection(small_dataset_file: Path) -> None:
     batch = next(iter(dataset))
     assert list(batch.columns) == columns
     assert batch.shape == (2, 3)
+
+
+def test_habr_dataset_missing_keys_are_none(tmp_path: Path) -> None:
+    file_path = tmp_path / "sparse.jsonl.zst"
+    lines = b'{"id": 1, "title": "A"}\n\n{"id": 2, "author": "B"}\n'
+    file_path.write_bytes(zstd.ZstdCompressor().compress(lines))
+
+    batch = next(iter(HabrDataset(path=file_path, batch_size=10)))
+    assert list(batch.columns) == ["id", "title", "author"]
+    assert batch["title"].tolist() == ["A", None]
+    assert batch["author"].tolist() == [None, "B"]
+
+    batch = next(iter(HabrDataset(path=file_path, columns=["author", "id"])))
+    assert list(batch.columns) == ["author", "id"]
+    assert batch["id"].tolist() == [1, 2]
+
+
+def test_habr_dataset_cache_matches_jsonl(
+    small_dataset_file: Path, tmp_path: Path
+) -> None:
+    pytest.importorskip("pyarrow")
+    cache_dir = tmp_path / "cache"
+    columns = ["id", "title", "statistics", "comments"]
+
+    expected = HabrDataset(path=small_dataset_file, columns=columns).get_dataframe()
+    cached = HabrDataset(path=small_dataset_file, columns=columns, cache_dir=cache_dir)
+    first = cached.get_dataframe()
+    assert cached.cache_path.exists()
+    second = cached.get_dataframe()
+
+    pd.testing.assert_frame_equal(first, expected)
+    pd.testing.assert_frame_equal(second, expected)
+    assert second["statistics"].tolist() == [
+        {"readingCount": 100},
+        {"readingCount": 200},
+    ]
+
+
+def test_arrow_cache_merges_schema_across_batches(tmp_path: Path) -> None:
+    pytest.importorskip("pyarrow")
+    from ml_training.data.arrow_cache import ArrowCacheWriter, iter_arrow_cache
+
+    path = tmp_path / "cache.arrow"
+    writer = ArrowCacheWriter(path)
+    writer.write({"id": [1, 2], "score": [1, 2], "kind": [1, None]}, 2)
+    writer.write({"id": [3], "score": [0.5], "kind": ["a"], "tags": [["x"]]}, 1)
+    writer.write({"id": [4], "tags": [None]}, 1)
+    writer.close()
+
+    df = next(iter_arrow_cache(path, None, [], batch_size=10))
+    assert list(df.columns) == ["id", "score", "kind", "tags"]
+    assert df["id"].tolist() == [1, 2, 3, 4]
+    assert df["score"].dtype == "float64"
+    assert df["score"].tolist()[:3] == [1.0, 2.0, 0.5]
+    assert pd.isna(df["score"].iloc[3])
+    assert df["kind"].tolist() == [1, None, "a", None]
+    assert df["tags"].tolist() == [None, None, ["x"], None]
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_habr_dataset_reads_shards_in_parallel(tmp_path: Path) -> None:
+    df = pd.DataFrame({"id": range(23), "hubs": [[f"hub_{i % 3}"] for i in range(23)]})
+    path = tmp_path / "train.jsonl.zst"
+    save_jsonl_zst(df, path, num_shards=3, frame_rows=4)
+
+    sequential = HabrDataset(path=path, batch_size=5).get_dataframe()
+    batches = [batch for batch in HabrDataset(path=path, batch_size=5, num_workers=2)]
+
+    assert [len(batch) for batch in batches] == [5, 5, 5, 5, 3]
+    pd.testing.assert_frame_equal(pd.concat(batches, ignore_index=True), sequential)
+    assert sequential["id"].tolist() == list(range(23))
+    assert sequential["hubs"].tolist() == df["hubs"].tolist()
+
+
+def test_habr_dataset_reads_all_frames(tmp_path: Path) -> None:
+    path = tmp_path / "framed.jsonl.zst"
+    save_jsonl_zst(pd.DataFrame({"id": range(10)}), path, frame_rows=3)
+
+    df = HabrDataset(path=path, batch_size=4).get_dataframe()
+    assert df["id"].tolist() == list(range(10))
+
+
+def test_stale_frame_table_is_ignored(tmp_path: Path) -> None:
+    path = tmp_path / "stale.jsonl.zst"
+    save_jsonl_zst(pd.DataFrame({"id": range(10)}), path, frame_rows=3)
+    assert read_frame_table(path) is not None
+
+    # Rewritten as a single stream, the old sidecar no longer matches the file
+    lines = b"".join(b'{"id": %d}\n' % i for i in range(20))
+    path.write_bytes(zstd.ZstdCompressor().compress(lines))
+
+    assert read_frame_table(path) is None
+    df = HabrDataset(path=path, batch_size=4).get_dataframe()
+    assert df["id"].tolist() == list(range(20))
+
+
+def test_jsonl_zst_writer_threads_and_append(tmp_path: Path) -> None:
+    path = tmp_path / "stream.jsonl.zst"
+    df = pd.DataFrame({"id": range(25), "hubs": [["a", "b"]] * 25})
+    save_jsonl_zst(df, path, frame_rows=4, level=1, threads=3)
+
+    with JsonlZstWriter(path, frame_rows=4, append=True) as writer:
+        writer.write_columns({"id": [25, 26], "hubs": [["c"], ["d"]]})
+        writer.write({"id": 27, "hubs": []})
+
+    result = HabrDataset(path=path, batch_size=10).get_dataframe()
+    assert result["id"].tolist() == list(range(28))
+    assert result["hubs"].tolist()[-4:] == [["a", "b"], ["c"], ["d"], []]
+    assert len(HabrDataset(path=path)) == 28
+
+
+def test_jsonl_zst_append_rejects_stale_frame_table(tmp_path: Path) -> None:
+    path = tmp_path / "stream.jsonl.zst"
+    save_jsonl_zst(pd.DataFrame({"id": range(5)}), path, frame_rows=2)
+    # Frames written after the sidecar, e.g. by an interrupted writer
+    with open(path, "ab") as f:
+        f.write(zstd.ZstdCompressor().compress(b'{"id": 5}\n'))
+    content = path.read_bytes()
+
+    with pytest.raises(ValueError, match="no frame table"):
+        JsonlZstWriter(path, append=True)
+    assert path.read_bytes() == content
+
+
+def test_habr_dataset_random_access(small_dataset_file: Path, tmp_path: Path) -> None:
+    # A single-stream file is indexed by streaming, but not randomly accessed
+    unframed = HabrDataset(path=small_dataset_file)
+    assert len(unframed) == 2
+    with pytest.raises(ValueError, match="reframe_jsonl_zst"):
+        unframed[0]
+
+    framed_file = tmp_path / "framed.jsonl.zst"
+    reframe_jsonl_zst(small_dataset_file, framed_file, frame_rows=1)
+    dataset = HabrDataset(path=framed_file, columns=["id", "title"])
+
+    assert len(dataset) == 2
+    assert dataset[1] == {"id": 2, "title": "Title 2"}
+    assert dataset[-2] == {"id": 1, "title": "Title 1"}
+    assert dataset.get_by_id(2)["title"] == "Title 2"
+    with pytest.raises(KeyError):
+        dataset.get_by_id(3)
+    with pytest.raises(IndexError):
+        dataset[2]
+
+    # The sidecar index is reused by new dataset objects
+    reloaded = HabrDataset(path=framed_file)
+    assert reloaded.index.ids.tolist() == [1, 2]
+
+
+def test_habr_dataset_len_from_frame_table(tmp_path: Path) -> None:
+    path = tmp_path / "framed.jsonl.zst"
+    save_jsonl_zst(pd.DataFrame({"id": range(10)}), path, frame_rows=3)
+
+    dataset = HabrDataset(path=path)
+    assert len(dataset) == 10
+    assert dataset._index is None
+    assert dataset[7] == {"id": 7}
+
+
+def test_habr_dataset_index_location(
+    small_dataset_file: Path, tmp_path: Path, caplog: pytest.LogCaptureFixture
+) -> None:
+    cache_dir = tmp_path / "cache"
+    assert len(HabrDataset(path=small_dataset_file, cache_dir=cache_dir)) == 2
+    assert [p.suffixes[-2:] for p in cache_dir.iterdir()] == [[".index", ".npz"]]
+
+    assert len(HabrDataset(path=small_dataset_file, save_index=False)) == 2
+    assert not Path(f"{small_dataset_file}.index.npz").exists()
+
+    # A sidecar that can't be written leaves the index in memory
+    blocker = tmp_path / "blocker"
+    blocker.write_text("")
+    dataset = HabrDataset(path=small_dataset_file, index_dir=blocker / "index")
+    assert len(dataset) == 2
+    assert dataset.index.ids.tolist() == [1, 2]
+    assert "in memory" in caplog.text
+    assert not Path(f"{small_dataset_file}.index.npz").exists()
+
+
+@pytest.mark.parametrize("use_cache", [False, True])
+def test_habr_dataset_filters(
+    small_dataset_file: Path, tmp_path: Path, use_cache: bool
+) -> None:
+    if use_cache:
+        pytest.importorskip("pyarrow")
+    cache_dir = tmp_path / "cache" if use_cache else None
+
+    dataset = HabrDataset(
+        path=small_dataset_file,
+        columns=["id", "title"],
+        filters=[Eq("language", "en")],
+        cache_dir=cache_dir,
+    )
+    df = dataset.get_dataframe()
+    assert df.to_dict(orient="records") == [{"id": 2, "title": "Title 2"}]
+
+    dataset = HabrDataset(
+        path=small_dataset_file,
+        columns=["id"],
+        filters=[Between("id", high=1), lambda record: record["author"] != ""],
+        cache_dir=cache_dir,
+    )
+    assert dataset.get_dataframe()["id"].tolist() == [1]
+
+
+def test_parallel_read_runs_unpicklable_filters_in_parent(tmp_path: Path) -> None:
+    df = pd.DataFrame({"id": range(20), "language": ["ru", "en"] * 10})
+    path = tmp_path / "framed.jsonl.zst"
+    save_jsonl_zst(df, path, frame_rows=3)
+
+    dataset = HabrDataset(
+        path=path,
+        columns=["id"],
+        num_workers=2,
+        filters=[Eq("language", "en"), lambda record: record["id"] % 3 == 0],
+    )
+    result = dataset.get_dataframe()
+
+    assert list(result.columns) == ["id"]
+    assert result["id"].tolist() == [3, 9, 15]
+
+
+def test_row_filter_requires_matches() -> None:
+    class Incomplete(RowFilter):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()  # type: ignore[abstract]
+
+
+def test_line_may_match_skips_lines_without_hints() -> None:
+    filters = as_row_filters([ContainsAny("hubs", ["python", "хабр"])])
+
+    assert line_may_match(b'{"hubs": ["python"]}', filters)
+    assert line_may_match('{"hubs": ["хабр"]}'.encode("utf-8"), filters)
+    assert line_may_match(b'{"hubs": ["\\u0445\\u0430\\u0431\\u0440"]}', filters)
+    assert not line_may_match(b'{"hubs": ["go"]}', filters)
+
+
+def test_cache_rejects_filters_on_excluded_columns(
+    small_dataset_file: Path, tmp_path: Path
+) -> None:
+    filters = [Eq("text_html", "<p>Another long text</p>")]
+    with pytest.raises(ValueError, match="exclude_columns"):
+        HabrDataset(path=small_dataset_file, filters=filters, cache_dir=tmp_path)
+
+    # Without the cache, filters see whole records
+    dataset = HabrDataset(path=small_dataset_file, filters=filters)
+    assert dataset.get_dataframe()["id"].tolist() == [2]
@@ -0,0 +1,33 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("torch")
+
+from ml_training.data.hub_vocabulary import HubVocabulary  # noqa: E402
+from ml_training.data.targets import Target  # noqa: E402
+from ml_training.models.encoders.hub_averaging_encoder import HubEncoder  # noqa: E402
+
+
+@pytest.mark.parametrize("sparse", [False, True])
+def test_hub_encoder_uses_vocabulary_ids(sparse: bool, tmp_path: Path) -> None:
+    vocabulary = HubVocabulary(["go", "python", "ml"])
+    df = pd.DataFrame({"hubs": [["python"], ["python", "ml"], ["ml"]]})
+    target = Target(df, "hubs", sparse=sparse, vocabulary=vocabulary)
+    embeddings = np.array([[1.0, 0.0], [3.0, 2.0], [0.0, 4.0]])
+
+    encoder = HubEncoder(dim=2)
+    encoder.fit(target, embeddings)
+
+    assert encoder.vocabulary.names == ["go", "python", "ml"]
+    np.testing.assert_allclose(encoder.hub_matrix, [[0, 0], [2, 1], [1.5, 3]])
+    np.testing.assert_allclose(
+        encoder.transform(["ml", "unknown", "python"]), [[1.5, 3], [0, 0], [2, 1]]
+    )
+
+    encoder.save(tmp_path / "hub_encoder.pt")
+    loaded = HubEncoder.load(tmp_path / "hub_encoder.pt")
+    assert loaded.vocabulary.names == encoder.vocabulary.names
+    np.testing.assert_allclose(loaded.hub_matrix, encoder.hub_matrix)
@@ -0,0 +1,55 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml_training.data.hub_vocabulary import HubCodes, HubVocabulary
+from ml_training.data.targets import Target
+
+
+def test_encode_grows_with_stable_ids(tmp_path: Path) -> None:
+    vocabulary = HubVocabulary(["python"])
+    codes = vocabulary.encode([["go", "python"], [], "rust", ["go"]])
+
+    assert vocabulary.names == ["python", "go", "rust"]
+    assert codes.offsets.tolist() == [0, 2, 2, 3, 4]
+    assert codes.ids.tolist() == [1, 0, 2, 1]
+    assert codes.ids.dtype == np.int32
+    assert vocabulary.decode(codes.row(0)) == ["go", "python"]
+
+    path = tmp_path / "hubs.json"
+    vocabulary.save(path)
+    loaded = HubVocabulary.load(path)
+    assert loaded.ids == vocabulary.ids
+
+    frozen = loaded.encode([["python", "unknown"]], grow=False)
+    assert frozen.ids.tolist() == [0]
+    assert len(loaded) == 3
+
+
+def test_encode_accepts_id_arrays_and_concatenates() -> None:
+    vocabulary = HubVocabulary(["a", "b", "c"])
+    first = vocabulary.encode(pd.Series([np.array([2, 0]), np.array([], dtype=int)]))
+    second = vocabulary.encode([["b"]])
+    codes = HubCodes.concatenate([first, second])
+
+    assert codes.offsets.tolist() == [0, 2, 2, 3]
+    assert codes.ids.tolist() == [2, 0, 1]
+    assert codes.row_indices().tolist() == [0, 0, 2]
+    assert codes.to_csr(3).toarray().tolist() == [[1, 0, 1], [0, 0, 0], [0, 1, 0]]
+
+    for bad_ids in [np.array([0, 3]), np.array([-1])]:
+        with pytest.raises(ValueError, match="out of range"):
+            vocabulary.encode([bad_ids], grow=False)
+
+
+def test_target_uses_shared_vocabulary() -> None:
+    vocabulary = HubVocabulary(["z", "a"])
+    dataset = pd.DataFrame({"hubs": [["a", "b"], ["z"], ["a", "a"]]})
+    target = Target(dataset, "hubs", sparse=True, vocabulary=vocabulary)
+
+    assert target.labels == ["z", "a", "b"]
+    assert target.labels_to_ids == {"z": 0, "a": 1, "b": 2}
+    assert target["a"].tolist() == [1, 0, 1]
+    assert target.binary_mask.format == "csc"
@@ -0,0 +1,54 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml_training.data.hub_vocabulary import HubVocabulary
+from ml_training.data.pair_dataset import PairDataset, PairDatasetWriter
+
+
+def test_pair_dataset_joins_articles_lazily(tmp_path: Path) -> None:
+    path = tmp_path / "pairs"
+    with PairDatasetWriter(path, HubVocabulary("abc"), frame_rows=2) as writer:
+        writer.write_batch(
+            pd.DataFrame({"id": [10, 11, 12], "text": ["x", "y", "z"]}),
+            np.array([0, 0, 2]),
+            np.array([0, 1, 2]),
+            np.array([1, 0, 1]),
+        )
+        writer.write_batch(
+            pd.DataFrame({"id": [13, 14], "text": ["u", "v"]}),
+            np.array([1, 1]),
+            np.array([2, 0]),
+            np.array([1, 0]),
+        )
+
+    expected = pd.DataFrame(
+        {
+            "text": ["x", "x", "z", "v", "v"],
+            "hub": ["a", "b", "c", "c", "a"],
+            "label": np.array([1, 0, 1, 1, 0], dtype=np.int8),
+        }
+    )
+    dataset = PairDataset(path, columns=["text"], batch_size=2)
+
+    assert len(dataset) == 5
+    assert dataset.article_idx.tolist() == [0, 0, 2, 4, 4]
+    pd.testing.assert_frame_equal(dataset.get_dataframe(), expected)
+    assert dataset[3] == {"text": "v", "hub": "c", "label": 1}
+
+
+def test_aborted_writer_leaves_no_files(tmp_path: Path) -> None:
+    path = tmp_path / "pairs"
+    with pytest.raises(RuntimeError):
+        with PairDatasetWriter(path, HubVocabulary("ab")) as writer:
+            writer.write_batch(
+                pd.DataFrame({"id": [1], "text": ["x"]}),
+                np.array([0]),
+                np.array([1]),
+                np.array([1]),
+            )
+            raise RuntimeError("interrupted")
+
+    assert not path.exists()
@@ -0,0 +1,39 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from ml_training.data.habr_dataset import HabrDataset
+from ml_training.data.split_dataset import assign_splits, split_dataset
+from ml_training.utils import save_jsonl_zst
+
+
+def test_assign_splits_is_deterministic_and_proportional() -> None:
+    ids = np.arange(100_000)
+    codes = assign_splits(ids, [0.6, 0.2, 0.2], seed=42)
+
+    assert np.array_equal(codes, assign_splits(ids[::-1], [0.6, 0.2, 0.2], 42)[::-1])
+    assert not np.array_equal(codes, assign_splits(ids, [0.6, 0.2, 0.2], seed=7))
+    shares = np.bincount(codes, minlength=3) / len(ids)
+    assert np.allclose(shares, [0.6, 0.2, 0.2], atol=0.01)
+
+
+def test_split_dataset_streams_disjoint_splits(tmp_path: Path) -> None:
+    input_path = tmp_path / "habr.jsonl.zst"
+    df = pd.DataFrame(
+        {
+            "id": range(200),
+            "text_markdown": [f"text {i}" for i in range(200)],
+            "hubs": [["hub"]] * 200,
+        }
+    )
+    save_jsonl_zst(df, input_path)
+    paths = [tmp_path / f"{name}.jsonl.zst" for name in ["train", "val", "test"]]
+
+    split_dataset(input_path, *paths, val_size=0.2, test_size=0.2, reader_batch_size=32)
+
+    splits = [HabrDataset(path).get_dataframe() for path in paths]
+    ids = sorted(i for split in splits for i in split["id"])
+    assert ids == list(range(200))
+    assert all(len(split) > 0 for split in splits)
+    assert list(splits[0].columns) == ["id", "text_markdown", "hubs"]
@@ -1,8 +1,12 @@
+from pathlib import Path
+
 import numpy as np
 import pandas as pd
 import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import MultiLabelBinarizer
 
-from ml_training.data.targets import Target
+from ml_training.data.targets import Target, load_clusters
 
 
 @pytest.fixture
@@ -211,3 +215,196 @@ def test_empty_dataset() -> None:
     assert len(target) == 0
     assert target.labels == []
     assert target.binary_mask.shape == (0, 0)
+
+
+@pytest.mark.parametrize("sparse", [False, True])
+def test_binary_mask_matches_multilabel_binarizer(sparse: bool) -> None:
+    rng = np.random.default_rng(0)
+    hubs = [f"hub_{i}" for i in range(30)]
+    column = pd.Series(
+        [list(rng.choice(hubs, size=rng.integers(0, 5))) for _ in range(200)]
+        + ["single", []],
+        index=rng.permutation(202),
+    )
+    target = Target(
+        dataset=pd.DataFrame({"hubs": column}), column_name="hubs", sparse=sparse
+    )
+
+    expected_targets = Target._as_str_list(column)
+    expected_labels = Target._get_labels(expected_targets)
+    expected = MultiLabelBinarizer(classes=expected_labels).fit_transform(
+        expected_targets
+    )
+    mask = target.binary_mask.toarray() if sparse else target.binary_mask
+
+    assert target.labels == expected_labels
+    assert target.labels_to_ids == {label: i for i, label in enumerate(expected_labels)}
+    assert np.array_equal(mask, expected)
+
+
+@pytest.mark.parametrize(
+    "sparse,packed", [(False, False), (True, False), (False, True)]
+)
+def test_cached_layouts_and_counts(
+    sample_dataset_multilabel: pd.DataFrame, sparse: bool, packed: bool
+) -> None:
+    target = Target(
+        dataset=sample_dataset_multilabel,
+        column_name="tags",
+        sparse=sparse,
+        packed=packed,
+    )
+
+    assert target.csr.format == "csr" and target.csc.format == "csc"
+    assert target.csr is target.csr
+    assert target.label_sizes.tolist() == [3, 2, 2]
+    assert target.doc_label_counts.tolist() == [2, 1, 3, 1, 0]
+    assert target.labels_of(2).tolist() == [0, 1, 2]
+    assert target.get_sizes("red") == 2
+    assert target.get_sizes(["blue", "red"]).tolist() == [3, 2]
+    assert target.get_coverage() == pytest.approx(0.8)
+    assert target.get_coverage("green") == pytest.approx(0.4)
+    assert target.get_coverage(["green", "red"]) == pytest.approx(0.6)
+
+
+def test_packed_mask_matches_dense() -> None:
+    rng = np.random.default_rng(1)
+    hubs = [f"hub_{i}" for i in range(21)]
+    dataset = pd.DataFrame(
+        {"hubs": [list(rng.choice(hubs, size=rng.integers(0, 6))) for _ in range(50)]}
+    )
+    dense = Target(dataset=dataset, column_name="hubs")
+    packed = Target(dataset=dataset, column_name="hubs", packed=True)
+
+    assert dense.binary_mask.dtype == bool
+    assert packed.binary_mask.nbytes == 50 * 3
+    assert np.array_equal(packed.binary_mask.toarray(), dense.binary_mask)
+    assert np.array_equal(packed.binary_mask.sum(axis=0), dense.binary_mask.sum(axis=0))
+    assert np.array_equal(packed.binary_mask.sum(axis=1), dense.binary_mask.sum(axis=1))
+    assert np.array_equal(packed[[3, 17]], dense[[3, 17]])
+    assert np.array_equal(packed["hub_9"], dense["hub_9"])
+    assert (packed.csr != dense.csr).nnz == 0
+    assert packed.get_coverage(["hub_1", "hub_20"]) == dense.get_coverage(
+        ["hub_1", "hub_20"]
+    )
+
+
+@pytest.mark.parametrize(
+    "sparse,packed", [(False, False), (True, False), (False, True)]
+)
+def test_save_and_load_memory_mapped(
+    tmp_path: Path, sample_dataset_multilabel: pd.DataFrame, sparse: bool, packed: bool
+) -> None:
+    target = Target(
+        dataset=sample_dataset_multilabel,
+        column_name="tags",
+        sparse=sparse,
+        packed=packed,
+    )
+    target.save(tmp_path / "target")
+
+    loaded = Target.load(tmp_path / "target")
+
+    assert loaded.dataset is None
+    assert loaded.labels == target.labels
+    assert loaded.labels_to_ids == target.labels_to_ids
+    assert loaded.sparse == sparse
+    assert np.array_equal(loaded["red"], target["red"])
+    assert loaded.label_sizes.tolist() == target.label_sizes.tolist()
+    assert loaded.get_coverage(["green", "red"]) == target.get_coverage(
+        ["green", "red"]
+    )
+    if sparse:
+        # Read-only views of the memory-mapped files, not copies
+        assert not loaded.binary_mask.indices.flags.writeable
+    with pytest.raises(ValueError):
+        loaded.targets
+
+
+@pytest.mark.parametrize("method", ["frequency", "tfidf"])
+def test_top_words_per_label(method: str) -> None:
+    dataset = pd.DataFrame(
+        {
+            "text": [
+                "python code python",
+                "python data science",
+                "cat dog cat",
+                "dog park walk",
+                "data code",
+            ],
+            "tags": [["py"], ["py", "ds"], ["pets"], ["pets"], []],
+        }
+    )
+    target = Target(dataset=dataset, column_name="tags", sparse=True)
+    vectorizer = TfidfVectorizer(min_df=1).fit(dataset["text"])
+    text_matrix = vectorizer.transform(dataset["text"]).toarray()
+    words = vectorizer.get_feature_names_out()
+
+    labels = target.csr.toarray().astype(float)
+    expected_scores = labels.T @ text_matrix
+    if method == "tfidf":
+        expected_scores /= np.maximum(labels.sum(axis=0), 1)[:, None]
+        expected_scores /= (text_matrix.sum(axis=0) + 1e-10) / len(dataset)
+
+    prefitted = target.get_top_words_per_label(
+        "text", n_words=2, method=method, vectorizer=vectorizer
+    )
+    precomputed = target.get_top_words_per_label(
+        n_words=2,
+        method=method,
+        text_matrix=text_matrix,
+        feature_names=words,
+        chunk_size=1,
+        n_jobs=2,
+    )
+
+    assert prefitted == precomputed
+    # Ties may come in any order, so compare scores of the returned words
+    word_ids = {word: j for j, word in enumerate(words)}
+    for i, label in enumerate(target.labels):
+        expected = np.sort(expected_scores[i])[::-1][:2]
+        returned = [score for _, score in precomputed[label]]
+        assert returned == pytest.approx(expected.tolist(), rel=1e-5)
+        for word, score in precomputed[label]:
+            assert expected_scores[i][word_ids[word]] == pytest.approx(score, rel=1e-5)
+
+
+@pytest.mark.parametrize("sparse", [False, True])
+def test_project_to_clusters(
+    sample_dataset_multilabel: pd.DataFrame, sparse: bool
+) -> None:
+    target = Target(
+        dataset=sample_dataset_multilabel, column_name="tags", sparse=sparse
+    )
+    clusters = {"warm": ["red", "orange"], "cold": ["blue", "green"]}
+
+    projected = target.project(clusters)
+
+    assert projected.labels == ["warm", "cold"]
+    assert projected.csr.toarray().tolist() == [[1, 1], [0, 1], [1, 1], [0, 1], [0, 0]]
+    assert projected.get_sizes().tolist() == [2, 4]
+    assert projected.targets.tolist() == [
+        ["warm", "cold"],
+        ["cold"],
+        ["warm", "cold"],
+        ["cold"],
+        [],
+    ]
+    assert projected.parent is target
+    assert target.project(clusters) is projected
+
+    partial = {"warm": ["red"]}
+    assert target.project(partial).labels == ["warm"]
+    own = target.project(partial, missing="own")
+    assert own.labels == ["warm", "blue", "green"]
+    assert own.get_sizes().tolist() == [2, 3, 2]
+    other = target.project(partial, missing="other")
+    assert other.labels == ["warm", "other"]
+    assert other.get_sizes("other") == 4
+
+
+def test_load_clusters_file() -> None:
+    path = Path(__file__).parents[2] / "data" / "targets" / "clusters.json"
+    clusters = load_clusters(path)
+
+    assert clusters and all(isinstance(hubs, list) for hubs in clusters.values())